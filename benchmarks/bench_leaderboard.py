@@ -0,0 +1,299 @@
+"""Benchmark suite: how /leaderboard and /rank scale with guild size
+
+Builds synthetic guilds of fake members with offline placeholder avatars and times
+the rank index build, rank lookups, page slicing, page drawing, image encoding and the
+whole generate_leaderboard_image call, plus peak traced memory. Results are written
+as JSON so runs can be compared.
+
+Run from the repository root:
+    python benchmarks/bench_leaderboard.py [--sizes 1000,100000,1000000] [--output results.json]
+    python benchmarks/bench_leaderboard.py --compare baseline.json [--tolerance 0.25]
+
+With --compare the exit status is 1 when any timing is slower than the baseline by
+more than the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from leveling.avatars import placeholder_avatar
+from leveling.curves import CURVES
+from leveling.rank_index import RankIndex
+from leveling.encoding import encode, encode_smallest
+from leveling.render import draw_leaderboard
+from leveling.table import GuildTable
+
+SIZES = (1_000, 100_000, 1_000_000)
+GUILD_ID = 1
+FIRST_USER_ID = 100_000_000_000_000_000
+RANK_LOOKUPS = 10_000
+PAGE_RUNS = 20
+MAX_TOTAL_XP = 2_000_000
+# Timings this small are mostly noise and are not compared against a baseline
+MIN_COMPARE_MS = 0.1
+
+
+class FakeAvatar:
+    def __init__(self, user_id):
+        self.key = f"avatar{user_id}"
+        self.url = f"https://cdn.invalid/avatars/{user_id}.png"
+
+
+class FakeMember:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.bot = False
+        self.display_name = f"member{user_id % 100_000}"
+        self.display_avatar = FakeAvatar(user_id)
+
+
+class FakeGuild:
+    """Every user in the guild's data is still a member"""
+    
+    def __init__(self, guild_id):
+        self.id = guild_id
+    
+    def get_member(self, user_id):
+        return FakeMember(user_id)
+
+
+class FakeBot:
+    """Enough of a bot for the Leveling cog to load and unload"""
+    
+    def add_dynamic_items(self, *items):
+        pass
+    
+    def remove_dynamic_items(self, *items):
+        pass
+    
+    def get_cog(self, name):
+        return None
+    
+    def get_guild(self, guild_id):
+        # FakeGuild has every user as a member, so skip the presence filter
+        return None
+
+
+def build_guild(size: int, seed: int = 0):
+    """GuildTable of `size` users with levels consistent with the flowy curve"""
+    rng = random.Random(seed)
+    curve = CURVES["flowy"]
+    table = GuildTable()
+    for i in range(size):
+        # Skewed like a real server: most members barely talk
+        total_xp = int(MAX_TOTAL_XP * rng.random() ** 4)
+        table.set(FIRST_USER_ID + i, total_xp % 1000, curve.level_for(total_xp), total_xp, total_xp // 20)
+    return table
+
+
+def timed(func, runs: int):
+    """Mean and p95 of `runs` calls, in milliseconds"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"mean_ms": statistics.fmean(samples), "p95_ms": samples[max(0, math.ceil(runs * 0.95) - 1)]}
+
+
+def sample_page(table: GuildTable, index: RankIndex, page: int):
+    """Plain page data as generate_leaderboard_image passes it to the render pool"""
+    curve = CURVES["flowy"]
+    avatar = placeholder_avatar(52).tobytes()
+    start = (page - 1) * 10
+    rows = []
+    for slot, user_id in enumerate(index.page(start, start + 10)):
+        data = table[user_id]
+        level = data["level"]
+        current = curve.threshold(level)
+        needed = max(1, curve.threshold(level + 1) - current)
+        rows.append({
+            "rank": start + slot + 1,
+            "slot": slot,
+            "name": f"member{user_id % 100_000}",
+            "level": level,
+            "total_xp": data["total_xp"],
+            "progress": min(max((data["total_xp"] - current) / needed, 0), 1.0),
+            "avatar": avatar,
+            "avatar_size": 52
+        })
+    max_pages = -(-len(index) // 10)
+    return {"page": page, "max_pages": max_pages, "row_count": len(rows), "rows": rows}
+
+
+async def bench_cog(table: GuildTable, runs: int):
+    """generate_leaderboard_image end to end, in a scratch directory so no real data is touched"""
+    from cogs.leveling import Leveling
+    
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            cog = Leveling(FakeBot())
+            
+            async def offline_avatars(members, size):
+                return [placeholder_avatar(size) for _ in members]
+            
+            cog.avatars.fetch_many = offline_avatars
+            cog.levels_data[str(GUILD_ID)] = table
+            guild = FakeGuild(GUILD_ID)
+            max_pages = -(-len(table) // 10)
+            
+            async def render(page):
+                start = time.perf_counter()
+                await cog.generate_leaderboard_image(guild, page)
+                return (time.perf_counter() - start) * 1000
+            
+            # The first call builds the rank index, later ones render pages that aren't cached yet
+            first_call_ms = await render(1)
+            pages = [1 + (i * 7919) % max_pages for i in range(1, runs + 1)]
+            cold = []
+            for page in pages:
+                cog.page_cache.clear()
+                cold.append(await render(page))
+            warm = [await render(pages[-1]) for _ in range(runs)]
+            await cog.cog_unload()
+        finally:
+            os.chdir(cwd)
+    
+    return {
+        "first_call_ms": first_call_ms,
+        "uncached_page_mean_ms": statistics.fmean(cold),
+        "cached_page_mean_ms": statistics.fmean(warm)
+    }
+
+
+def bench_size(size: int, page_runs: int):
+    result = {"users": size}
+    
+    start = time.perf_counter()
+    table = build_guild(size)
+    result["build_table_s"] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    index = RankIndex(table)
+    result["build_rank_index_s"] = time.perf_counter() - start
+    
+    rng = random.Random(1)
+    lookups = [FIRST_USER_ID + rng.randrange(size) for _ in range(RANK_LOOKUPS)]
+    start = time.perf_counter()
+    for user_id in lookups:
+        index.rank(user_id)
+    result["rank_lookup_us"] = (time.perf_counter() - start) / RANK_LOOKUPS * 1_000_000
+    
+    last_page = -(-size // 10)
+    result["page_slice_first"] = timed(lambda: index.page(0, 10), page_runs)
+    result["page_slice_last"] = timed(lambda: index.page((last_page - 1) * 10, last_page * 10), page_runs)
+    
+    page = sample_page(table, index, 1)
+    result["draw_page"] = timed(lambda: draw_leaderboard(page), page_runs)
+    image = draw_leaderboard(page)
+    for fmt in ("png", "webp", "jpeg"):
+        result[f"{fmt}_encode"] = timed(lambda: encode(image, fmt), page_runs)
+        result[f"{fmt}_bytes"] = len(encode(image, fmt))
+    data, fmt, _ = encode_smallest(image)
+    result["picked"] = {"format": fmt, "bytes": len(data)}
+    
+    result["generate_leaderboard_image"] = asyncio.run(bench_cog(table, page_runs))
+    del table, index
+    
+    # Separate pass, tracemalloc slows everything it watches
+    tracemalloc.start()
+    table = build_guild(size)
+    index = RankIndex(table)
+    draw_leaderboard(sample_page(table, index, 1))
+    result["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return result
+
+
+def timings(results: dict):
+    """Flatten every mean timing into {"size.name": milliseconds}, plus peak memory
+    
+    p95s are kept in the results but not compared, a handful of runs makes them noisy.
+    """
+    scale = {"_s": 1000, "_ms": 1, "_us": 0.001}
+    flat = {}
+    for entry in results["sizes"]:
+        prefix = str(entry["users"])
+        for name, value in entry.items():
+            if not isinstance(value, dict):
+                value = {"": value}
+            for sub, sub_value in value.items():
+                key = f"{name}.{sub}" if sub else name
+                if key.endswith("p95_ms"):
+                    continue
+                if key.endswith("peak_memory_mb"):
+                    flat[f"{prefix}.{key}"] = sub_value
+                for suffix, factor in scale.items():
+                    if key.endswith(suffix):
+                        flat[f"{prefix}.{key}"] = sub_value * factor
+    return flat
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Print every timing against the baseline, returns the ones that regressed"""
+    current = timings(results)
+    regressions = []
+    for name, old in timings(baseline).items():
+        new = current.get(name)
+        if new is None or max(old, new) < MIN_COMPARE_MS:
+            continue
+        change = (new - old) / old
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:60} {old:10.3f} -> {new:10.3f} ({change:+.0%}){flag}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="comma separated guild sizes")
+    parser.add_argument("--runs", type=int, default=PAGE_RUNS, help="runs per page timing")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+    
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "render_pool": os.getenv("LEVELING_RENDER_POOL", "thread"),
+        "sizes": []
+    }
+    for size in (int(size) for size in args.sizes.split(",")):
+        print(f"benchmarking {size:,} users...", file=sys.stderr)
+        results["sizes"].append(bench_size(size, args.runs))
+    
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} timing(s) regressed by more than {args.tolerance:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Memory benchmark: per-user dicts versus the columnar GuildTable
+
+Run from the repository root: python benchmarks/bench_memory.py [users]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leveling.curves import CURVES
+from leveling.table import GuildTable
+
+USERS = 1_000_000
+
+
+def build_dicts(users):
+    """The original layout: {str(user_id): {"xp", "level", "total_xp", "messages"}}"""
+    guild_data = {}
+    for user_id, total_xp in users:
+        guild_data[str(user_id)] = {
+            "xp": total_xp % 1000,
+            "level": 1,
+            "total_xp": total_xp,
+            "messages": total_xp // 20
+        }
+    return guild_data
+
+
+def build_table(users):
+    table = GuildTable()
+    for user_id, total_xp in users:
+        table.set(user_id, total_xp % 1000, 1, total_xp, total_xp // 20)
+    return table
+
+
+def measure(build, users):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(users)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else USERS
+    random.seed(0)
+    users = [(100_000_000_000_000_000 + i, random.randint(0, 500_000)) for i in range(count)]
+    
+    guild_data, dict_bytes, dict_time = measure(build_dicts, users)
+    del guild_data
+    table, table_bytes, table_time = measure(build_table, users)
+    
+    curve = CURVES["flowy"]
+    start = time.perf_counter()
+    curve.levels_for(table.column_view("total_xp"))
+    levels_time = time.perf_counter() - start
+    
+    mb = 1024 * 1024
+    print(f"{count:,} users")
+    print(f"dict per user:  {dict_bytes / mb:8.1f} MB ({dict_bytes / count:6.1f} B/user), built in {dict_time:.2f}s")
+    print(f"GuildTable:     {table_bytes / mb:8.1f} MB ({table_bytes / count:6.1f} B/user), built in {table_time:.2f}s "
+          f"({dict_bytes / table_bytes:.1f}x smaller)")
+    print(f"levels_for over the total_xp column: {levels_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Micro-benchmark: leaderboard row/progress-bar drawing before and after the prebuilt strips
+
+Run from the repository root: python benchmarks/bench_progress_bar.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from leveling.render import render_leaderboard, row_tile, progress_fill, BAR_OFFSET, BAR_WIDTH
+
+WIDTH = 800
+HEIGHT = 910
+ROWS = 10
+RUNS = 50
+
+
+def legacy_rows(progresses):
+    """The original per-column drawing from generate_leaderboard_image"""
+    img = Image.new('RGB', (WIDTH, HEIGHT), '#0f1014')
+    draw = ImageDraw.Draw(img)
+    for slot, progress in enumerate(progresses):
+        row_y = 92 + slot * 80
+        row_bg = (18, 20, 24) if slot % 2 else (22, 24, 28)
+        draw.rounded_rectangle([(12, row_y), (WIDTH - 12, row_y + 72)],
+                            radius=8, fill=row_bg, outline='#2f3136', width=2)
+        bar_x, bar_y, bar_width, bar_height = 470, row_y + 24, 290, 24
+        draw.rounded_rectangle([(bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height)],
+                            radius=12, fill='#0f1014', outline='#2f3136', width=1)
+        fill_width = max(int(bar_width * progress), 24)
+        for i in range(fill_width):
+            alpha = 1.0 - (i / fill_width) * 0.2
+            draw.rectangle([(bar_x + i, bar_y + 1), (bar_x + i + 1, bar_y + bar_height - 1)],
+                        fill=(int(88 * alpha), int(101 * alpha), int(242 * alpha)))
+    return img
+
+
+def strip_rows(progresses):
+    """Prebuilt row tiles and cropped gradient strips"""
+    img = Image.new('RGB', (WIDTH, HEIGHT), '#0f1014')
+    for slot, progress in enumerate(progresses):
+        row_y = 92 + slot * 80
+        tile = row_tile((18, 20, 24) if slot % 2 else (22, 24, 28))
+        img.paste(tile, (12, row_y), tile)
+        fill = progress_fill(max(int(BAR_WIDTH * progress), 24))
+        img.paste(fill, (12 + BAR_OFFSET[0], row_y + BAR_OFFSET[1] + 1), fill)
+    return img
+
+
+def sample_page(progresses):
+    avatar = Image.new('RGBA', (52, 52), (128, 128, 128, 255)).tobytes()
+    rows = [
+        {
+            "rank": slot + 1, "slot": slot, "name": f"member{slot}", "level": 10 - slot,
+            "total_xp": 50000 - slot * 1000, "progress": progress, "avatar": avatar, "avatar_size": 52
+        }
+        for slot, progress in enumerate(progresses)
+    ]
+    return {"page": 1, "max_pages": 1, "row_count": len(rows), "rows": rows}
+
+
+def main():
+    random.seed(0)
+    progresses = [random.uniform(0.3, 1.0) for _ in range(ROWS)]
+    
+    legacy = timeit.timeit(lambda: legacy_rows(progresses), number=RUNS) / RUNS
+    strips = timeit.timeit(lambda: strip_rows(progresses), number=RUNS) / RUNS
+    page = sample_page(progresses)
+    full = timeit.timeit(lambda: render_leaderboard(page), number=RUNS) / RUNS
+    
+    print(f"rows + progress bars, per-column drawing: {legacy * 1000:8.2f} ms/page")
+    print(f"rows + progress bars, prebuilt strips:    {strips * 1000:8.2f} ms/page ({legacy / strips:.1f}x faster)")
+    print(f"full render_leaderboard page:             {full * 1000:8.2f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,24 +17,38 @@ intents.members = True
 intents.guilds = True
 intents.messages = True
 
-# Create bot instance
-bot = commands.Bot(command_prefix="!", intents=intents)
-
-@bot.event
-async def on_ready():
-    print(f'✅ Bot is online as {bot.user}')
-    print(f'Bot ID: {bot.user.id}')
+def create_bot(shard_ids=None, shard_count=None, cluster_id=None):
+    """Single bot by default; with shard_ids/shard_count it runs only those shards (see cluster.py)"""
+    if shard_count is None:
+        bot = commands.Bot(command_prefix="!", intents=intents)
+    else:
+        bot = commands.AutoShardedBot(command_prefix="!", intents=intents, shard_ids=shard_ids, shard_count=shard_count)
+    bot.cluster_id = cluster_id
+    
+    @bot.event
+    async def on_ready():
+        print(f'✅ Bot is online as {bot.user}')
+        print(f'Bot ID: {bot.user.id}')
+        
+        # Commands are global, one cluster syncing them is enough
+        if bot.cluster_id not in (None, 0):
+            return
+        
+        # Sync slash commands
+        try:
+            synced = await bot.tree.sync()
+            print(f'✅ Synced {len(synced)} command(s)')
+        except Exception as e:
+            print(f'❌ Failed to sync commands: {e}')
     
-    # Sync slash commands
-    try:
-        synced = await bot.tree.sync()
-        print(f'✅ Synced {len(synced)} command(s)')
-    except Exception as e:
-        print(f'❌ Failed to sync commands: {e}')
+    return bot
 
 # Load all cogs
-async def load_cogs():
-    cog_files = ['messaging', 'roles', 'emojis', 'nqn', 'confessions', 'moderation', 'leveling', 'massping']
+async def load_cogs(bot):
+    # The dispatcher first, it runs the on_message handlers of the other cogs
+    cog_files = ['dispatcher', 'messaging', 'roles', 'emojis', 'nqn', 'confessions', 'moderation', 'leveling', 'massping']
+    if bot.cluster_id is not None:
+        cog_files.append('cluster')
     for cog in cog_files:
         try:
             await bot.load_extension(f'cogs.{cog}')
@@ -42,12 +56,14 @@ async def load_cogs():
         except Exception as e:
             print(f'❌ Failed to load {cog}: {e}')
 
-async def main():
-    # Start Flask web server for UptimeRobot
-    keep_alive()
+async def main(shard_ids=None, shard_count=None, cluster_id=None):
+    # Start Flask web server for UptimeRobot, once per machine
+    if cluster_id in (None, 0):
+        keep_alive()
     
+    bot = create_bot(shard_ids, shard_count, cluster_id)
     async with bot:
-        await load_cogs()
+        await load_cogs(bot)
         await bot.start(TOKEN)
 
 if __name__ == "__main__":
@@ -0,0 +1,190 @@
+"""Run the bot as several processes, each owning a slice of the shards
+
+    python cluster.py [--clusters N] [--shards M]
+
+Discord sends every event for a guild to one shard, and each shard lives in exactly
+one cluster, so a guild's XP, cooldowns and settings only ever change in the process
+that owns it. The processes share the leveling SQLite database; each one loads only
+its own guilds and keeps its own XP journal. Every cluster writes a heartbeat to the
+cluster_health table, shown by /cluster-status and the /health web route.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import sys
+import time
+
+from leveling.storage import LEVELS_DB_FILE, create_storage
+
+CLUSTER_COUNT = int(os.getenv("CLUSTER_COUNT", "2"))
+HEARTBEAT_INTERVAL = 15     # seconds between heartbeats
+HEARTBEAT_STALE = 60        # a cluster silent for this long is reported as down
+RESTART_DELAY = 10          # seconds before a crashed cluster is started again
+SHUTDOWN_TIMEOUT = 30
+
+
+def shard_of(guild_id: int, shard_count: int) -> int:
+    """Shard Discord routes a guild to"""
+    return (int(guild_id) >> 22) % shard_count
+
+
+def split_shards(shard_count: int, cluster_count: int):
+    """Contiguous shard ID ranges, one per cluster, as even as possible"""
+    per_cluster, extra = divmod(shard_count, cluster_count)
+    ranges = []
+    start = 0
+    for cluster_id in range(cluster_count):
+        end = start + per_cluster + (1 if cluster_id < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def connect(path: str = LEVELS_DB_FILE):
+    db = sqlite3.connect(path, timeout=30)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS cluster_health (
+            cluster_id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    return db
+
+
+def write_heartbeat(status: dict, path: str = LEVELS_DB_FILE):
+    db = connect(path)
+    try:
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO cluster_health (cluster_id, data, updated_at) VALUES (?, ?, ?)",
+                (status["cluster_id"], json.dumps(status), time.time())
+            )
+    finally:
+        db.close()
+
+
+def clear_heartbeats(path: str = LEVELS_DB_FILE):
+    db = connect(path)
+    try:
+        with db:
+            db.execute("DELETE FROM cluster_health")
+    finally:
+        db.close()
+
+
+def read_heartbeats(path: str = LEVELS_DB_FILE):
+    """Latest heartbeat of every cluster, with its age and whether it counts as up"""
+    if not os.path.exists(path):
+        return []
+    db = connect(path)
+    try:
+        rows = db.execute("SELECT data, updated_at FROM cluster_health ORDER BY cluster_id").fetchall()
+    finally:
+        db.close()
+    
+    now = time.time()
+    heartbeats = []
+    for data, updated_at in rows:
+        status = json.loads(data)
+        status["age"] = now - updated_at
+        status["up"] = status.get("state") != "stopped" and status["age"] < HEARTBEAT_STALE
+        heartbeats.append(status)
+    return heartbeats
+
+
+def run_cluster(cluster_id: int, shard_ids, shard_count: int):
+    """Entry point of a cluster process"""
+    os.environ["CLUSTER_ID"] = str(cluster_id)
+    import bot
+    
+    print(f"🚀 Cluster {cluster_id} starting shards {shard_ids} of {shard_count}")
+    try:
+        asyncio.run(bot.main(shard_ids, shard_count, cluster_id))
+    except KeyboardInterrupt:
+        pass
+
+
+class Shutdown(Exception):
+    """Raised from the SIGTERM handler"""
+
+
+def on_sigterm(signum, frame):
+    raise Shutdown
+
+
+def stop(processes, signal_children: bool):
+    """Let every cluster shut down cleanly so it flushes XP, then force the stragglers"""
+    if signal_children and os.name != "nt":
+        for process in processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGINT)
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+    for process in processes.values():
+        process.join(max(0, deadline - time.monotonic()))
+        if process.is_alive():
+            process.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot as several shard clusters")
+    parser.add_argument("--clusters", type=int, default=CLUSTER_COUNT, help="number of processes")
+    parser.add_argument("--shards", type=int, help="total shard count (default: one per cluster)")
+    args = parser.parse_args()
+    
+    shard_count = args.shards or args.clusters
+    if shard_count < args.clusters:
+        sys.exit("❌ Need at least one shard per cluster")
+    
+    # Clusters share the SQLite database; the JSON files can't take concurrent writers
+    os.environ["LEVELING_STORAGE"] = "sqlite"
+    # Migrate any JSON data once here, before the clusters race each other for it
+    create_storage("sqlite").close()
+    # Drop heartbeats of an earlier layout, e.g. clusters that no longer exist
+    clear_heartbeats()
+    
+    ctx = multiprocessing.get_context("spawn")
+    shard_ranges = split_shards(shard_count, args.clusters)
+    
+    def start(cluster_id):
+        process = ctx.Process(
+            target=run_cluster,
+            args=(cluster_id, shard_ranges[cluster_id], shard_count),
+            name=f"cluster-{cluster_id}"
+        )
+        process.start()
+        return process
+    
+    processes = {cluster_id: start(cluster_id) for cluster_id in range(args.clusters)}
+    
+    # SIGTERM from a service manager gets the same clean shutdown as Ctrl+C
+    signal.signal(signal.SIGTERM, on_sigterm)
+    
+    restart_at = {}
+    try:
+        while True:
+            time.sleep(1)
+            for cluster_id, process in processes.items():
+                if process.is_alive():
+                    continue
+                if cluster_id not in restart_at:
+                    print(f"⚠️ Cluster {cluster_id} exited with code {process.exitcode}, restarting in {RESTART_DELAY}s")
+                    restart_at[cluster_id] = time.monotonic() + RESTART_DELAY
+                elif time.monotonic() >= restart_at[cluster_id]:
+                    del restart_at[cluster_id]
+                    processes[cluster_id] = start(cluster_id)
+    except KeyboardInterrupt:
+        # Ctrl+C already reached every process in the terminal's process group
+        print("🛑 Stopping clusters...")
+        stop(processes, signal_children=False)
+    except Shutdown:
+        print("🛑 Stopping clusters...")
+        stop(processes, signal_children=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+import asyncio
+import math
+import os
+import time
+
+from cluster import HEARTBEAT_INTERVAL, read_heartbeats, shard_of, write_heartbeat
+
+class Cluster(commands.Cog):
+    """Heartbeats and status of the cluster processes (only loaded by cluster.py)"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.started = time.time()
+        self.heartbeat_task = None
+    
+    async def cog_load(self):
+        self.heartbeat_task = asyncio.create_task(self.heartbeat_loop())
+    
+    async def cog_unload(self):
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+        await asyncio.to_thread(write_heartbeat, self.status("stopped"))
+    
+    def status(self, state: str) -> dict:
+        latencies = {}
+        if self.bot.is_ready():
+            latencies = {
+                str(shard_id): round(latency * 1000) if math.isfinite(latency) else None
+                for shard_id, latency in self.bot.latencies
+            }
+        
+        status = {
+            "cluster_id": self.bot.cluster_id,
+            "pid": os.getpid(),
+            "state": state,
+            "shard_ids": list(self.bot.shard_ids or []),
+            "shard_count": self.bot.shard_count,
+            "guilds": len(self.bot.guilds),
+            "latency_ms": latencies,
+            "uptime": round(time.time() - self.started)
+        }
+        
+        leveling = self.bot.get_cog("Leveling")
+        if leveling:
+            ingest = leveling.ingest.metrics()
+            guilds = leveling.levels_data.metrics()
+            status["leveling"] = {
+                "guilds_loaded": guilds["resident"],
+                "guild_loads": guilds["loads"],
+                "guild_evictions": guilds["evictions"],
+                "dirty": leveling.dirty_count,
+                "ingest_depth": ingest["depth"],
+                "ingest_lag_ms": round(ingest["last_lag_ms"], 1),
+                "ingest_dropped": ingest["dropped"]
+            }
+        return status
+    
+    async def heartbeat_loop(self):
+        while True:
+            state = "ready" if self.bot.is_ready() else "starting"
+            try:
+                await asyncio.to_thread(write_heartbeat, self.status(state))
+            except Exception as e:
+                print(f"Cluster heartbeat failed: {e}")
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+    
+    @app_commands.command(name="cluster-status", description="Show the health of every bot cluster (Admin only)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def cluster_status(self, interaction: discord.Interaction):
+        heartbeats = await asyncio.to_thread(read_heartbeats)
+        shard_id = shard_of(interaction.guild.id, self.bot.shard_count)
+        
+        up = sum(1 for status in heartbeats if status["up"])
+        embed = discord.Embed(
+            title="🖥️ Cluster Status",
+            description=(
+                f"{up}/{len(heartbeats)} cluster(s) up\n"
+                f"This server is on shard {shard_id}, served by cluster {self.bot.cluster_id}"
+            ),
+            color=discord.Color.green() if up == len(heartbeats) else discord.Color.red()
+        )
+        
+        for status in heartbeats:
+            latencies = [ms for ms in status["latency_ms"].values() if ms is not None]
+            latency = f"{max(latencies)} ms" if latencies else "n/a"
+            shards = status["shard_ids"]
+            shard_text = f"{shards[0]}-{shards[-1]}" if len(shards) > 1 else ", ".join(map(str, shards))
+            lines = [
+                f"{'🟢' if status['up'] else '🔴'} {status['state']}, last seen {int(status['age'])}s ago",
+                f"Shards {shard_text} · {status['guilds']:,} guilds · worst latency {latency}",
+                f"PID {status['pid']} · up {status['uptime'] // 3600}h {status['uptime'] % 3600 // 60}m"
+            ]
+            if "leveling" in status:
+                leveling = status["leveling"]
+                lines.append(
+                    f"{leveling['dirty']:,} XP changes waiting to flush · "
+                    f"{leveling.get('ingest_depth', 0):,} messages queued, {leveling.get('ingest_lag_ms', 0)} ms lag"
+                )
+            embed.add_field(name=f"Cluster {status['cluster_id']}", value="\n".join(lines), inline=False)
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @cluster_status.error
+    async def cluster_status_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.MissingPermissions):
+            await interaction.response.send_message(
+                "❌ You need Administrator permissions!",
+                ephemeral=True
+            )
+
+async def setup(bot):
+    await bot.add_cog(Cluster(bot))
@@ -0,0 +1,159 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+import re
+import time
+
+def message_handler(prefix: str = None, pattern=None, priority: int = 0):
+    """Mark a cog method as a message handler, called by the Dispatcher cog
+    
+    With prefix the content must start with it, with pattern (a regex or a compiled one)
+    it must contain a match; with neither the handler gets every message. Bot and DM
+    messages never reach handlers. Handlers run one after another, lowest priority first,
+    so a slow handler should move its work into a task.
+    """
+    if isinstance(pattern, str):
+        pattern = re.compile(pattern)
+    
+    def decorator(func):
+        func.__message_handler__ = {"prefix": prefix, "pattern": pattern, "priority": priority}
+        return func
+    return decorator
+
+def add_message_handlers(bot, cog):
+    """Register a cog's handlers, call from cog_load (the dispatcher picks them up itself if it loads later)"""
+    dispatcher = bot.get_cog("Dispatcher")
+    if dispatcher is not None:
+        dispatcher.add_handlers(cog)
+
+def remove_message_handlers(bot, cog):
+    dispatcher = bot.get_cog("Dispatcher")
+    if dispatcher is not None:
+        dispatcher.remove_handlers(cog)
+
+class MessageHandler:
+    """A registered handler with its interest and timings"""
+    
+    __slots__ = ("cog", "name", "callback", "prefix", "pattern", "priority", "calls", "errors", "total_time", "max_time")
+    
+    def __init__(self, cog, name: str, callback, prefix: str, pattern, priority: int):
+        self.cog = cog
+        self.name = name
+        self.callback = callback
+        self.prefix = prefix
+        self.pattern = pattern
+        self.priority = priority
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+    
+    def wants(self, content: str) -> bool:
+        if self.prefix is not None and not content.startswith(self.prefix):
+            return False
+        if self.pattern is not None and self.pattern.search(content) is None:
+            return False
+        return True
+
+class Dispatcher(commands.Cog):
+    """The bot's only on_message listener, routes each message to the handlers that want it"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.handlers = []
+        self.messages = 0
+        self.filtered = 0
+    
+    async def cog_load(self):
+        # Cogs that loaded before the dispatcher
+        for cog in self.bot.cogs.values():
+            self.add_handlers(cog)
+    
+    def add_handlers(self, cog):
+        """Register every @message_handler method of a cog"""
+        self.remove_handlers(cog)
+        for name in dir(type(cog)):
+            options = getattr(getattr(type(cog), name, None), "__message_handler__", None)
+            if options is None:
+                continue
+            self.handlers.append(MessageHandler(
+                cog, f"{cog.qualified_name}.{name}", getattr(cog, name),
+                options["prefix"], options["pattern"], options["priority"]
+            ))
+        self.handlers.sort(key=lambda handler: handler.priority)
+    
+    def remove_handlers(self, cog):
+        self.handlers = [handler for handler in self.handlers if handler.cog is not cog]
+    
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        self.messages += 1
+        # Shared checks, done once instead of once per cog
+        if message.author.bot or message.guild is None:
+            self.filtered += 1
+            return
+        
+        content = message.content
+        for handler in self.handlers:
+            if not handler.wants(content):
+                continue
+            
+            # Wall time, including whatever the handler awaits
+            started = time.perf_counter()
+            try:
+                await handler.callback(message)
+            except Exception as e:
+                handler.errors += 1
+                print(f"Message handler {handler.name} failed: {e}")
+            finally:
+                elapsed = time.perf_counter() - started
+                handler.calls += 1
+                handler.total_time += elapsed
+                handler.max_time = max(handler.max_time, elapsed)
+    
+    def metrics(self) -> dict:
+        return {
+            "messages": self.messages,
+            "filtered": self.filtered,
+            "handlers": {
+                handler.name: {
+                    "calls": handler.calls,
+                    "errors": handler.errors,
+                    "mean_ms": handler.total_time / handler.calls * 1000 if handler.calls else 0.0,
+                    "max_ms": handler.max_time * 1000
+                }
+                for handler in self.handlers
+            }
+        }
+    
+    @app_commands.command(name="dispatcher-stats", description="Show message handler timings (Admin only)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def dispatcher_stats(self, interaction: discord.Interaction):
+        m = self.metrics()
+        embed = discord.Embed(
+            title="📨 Message Dispatcher",
+            description=f"{m['messages']:,} message(s) seen, {m['filtered']:,} from bots or DMs",
+            color=discord.Color.blue()
+        )
+        for name, handler in m["handlers"].items():
+            embed.add_field(
+                name=name,
+                value=(
+                    f"{handler['calls']:,} call(s), {handler['errors']} error(s)\n"
+                    f"Mean {handler['mean_ms']:.2f} ms, max {handler['max_ms']:.1f} ms"
+                ),
+                inline=False
+            )
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @dispatcher_stats.error
+    async def dispatcher_stats_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.MissingPermissions):
+            await interaction.response.send_message(
+                "❌ You need Administrator permissions!",
+                ephemeral=True
+            )
+
+async def setup(bot):
+    await bot.add_cog(Dispatcher(bot))
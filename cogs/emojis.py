@@ -2,25 +2,28 @@ import discord
 from discord.ext import commands
 import os
 import asyncio
+import re
+
+from cogs.dispatcher import message_handler, add_message_handlers, remove_message_handlers
 
 EMOJI_FOLDER = r"C:\Users\yosoy\OneDrive\Desktop\Kirito crib\Flowy\emojis"
 VALID_EXTS = (".png", ".jpg", ".gif")
+# Case-insensitive search, so the content isn't lower-cased for every message
+ADD_EMOTES_REGEX = re.compile("addemotes", re.IGNORECASE)
 
 class Emojis(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-        
-        if "addemotes" not in message.content.lower():
-            return
-        
+    async def cog_load(self):
+        add_message_handlers(self.bot, self)
+    
+    async def cog_unload(self):
+        remove_message_handlers(self.bot, self)
+    
+    @message_handler(pattern=ADD_EMOTES_REGEX, priority=20)
+    async def add_emotes(self, message):
         guild = message.guild
-        if guild is None:
-            return
         
         if not guild.me.guild_permissions.manage_emojis_and_stickers:
             await message.channel.send("❌ Missing Manage Emojis permission.")
@@ -1,385 +1,713 @@
 import discord
+import aiohttp
 from discord import app_commands
 from discord.ext import commands
-import json
 import os
 import random
 import math
-from datetime import datetime, timedelta
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from typing import Optional
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import io
-import requests
+import numpy as np
 
-LEVELS_DATA_FILE = "levels_data.json"
-SETTINGS_DATA_FILE = "level_settings.json"
-BACKGROUND_IMAGE = r"C:\Users\yosoy\OneDrive\Desktop\Kirito crib\Flowy\leaderboard.jpg"
+from leveling.storage import create_storage, cluster_path
+from leveling.journal import XPJournal, JOURNAL_FILE
+from leveling.rank_index import RankIndex
+from leveling.cache import LRUCache
+from leveling.avatars import AvatarFetcher
+from leveling.render import render_leaderboard, assets, row_cache
+from leveling.encoding import EXTENSIONS, EncodingMetrics
+from leveling.cooldowns import CooldownTracker
+from leveling.ingest import XPIngestQueue
+from leveling.announcements import LevelUpAnnouncer, join_names
+from leveling.rewards import RoleEditQueue, RewardSyncJob, RewardSyncState, REWARD_SYNC_FILE, plan_member
+from leveling.curves import CURVES, DEFAULT_CURVE, recalculate_levels
+from leveling.settings import GuildSettings, default_settings
+from leveling.table import GuildTable, NEW_USER, MAX_XP
+from leveling.guilds import GuildCache
+from cogs.dispatcher import message_handler, add_message_handlers, remove_message_handlers
+from leveling.bulk import (
+    BulkFormatError, EXPORT_FIELDS, LEADERBOARD_FIELDS, download_to_spool, format_for_filename,
+    count_import_rows, iter_import_rows, read_chunk, iter_export_rows, iter_leaderboard_rows, write_rows
+)
+
+# Write-behind persistence: XP changes are batched and flushed in the background
+FLUSH_INTERVAL = 30      # seconds between background flushes
+FLUSH_THRESHOLD = 500    # dirty entries that trigger an early flush
+
+# Rendered leaderboard pages, reused until a row on the page changes
+PAGE_CACHE_ENTRIES = 256
+PAGE_CACHE_BYTES = 32 * 1024 * 1024
+
+LEADERBOARD_PAGE_SIZE = 10
+
+# Leaderboard rendering runs in a "thread" or "process" pool off the event loop
+RENDER_POOL = os.getenv("LEVELING_RENDER_POOL", "thread")
+RENDER_WORKERS = int(os.getenv("LEVELING_RENDER_WORKERS", "2"))
+
+# Seconds between progress edits on the /xp-sync-roles reply
+REWARD_PROGRESS_INTERVAL = 5
+
+class LeaderboardButton(discord.ui.DynamicItem[discord.ui.Button], template=r"leaderboard:(?P<action>prev|page|next):(?P<page>[0-9]+)"):
+    """Leaderboard page button; the target page lives in the custom ID so it keeps working after a restart"""
+    
+    def __init__(self, action: str, page: int, label: str, disabled: bool = False):
+        super().__init__(discord.ui.Button(
+            label=label,
+            style=discord.ButtonStyle.primary if action == "page" else discord.ButtonStyle.secondary,
+            custom_id=f"leaderboard:{action}:{page}",
+            disabled=disabled
+        ))
+        self.page = page
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["action"], int(match["page"]), item.label or "")
+    
+    async def callback(self, interaction: discord.Interaction):
+        leveling = interaction.client.get_cog("Leveling")
+        if leveling is None:
+            await interaction.response.send_message("❌ Leveling is not available right now!", ephemeral=True)
+            return
+        await leveling.show_leaderboard_page(interaction, self.page)
+
+def leaderboard_file(image_bytes: bytes, fmt: str) -> discord.File:
+    return discord.File(io.BytesIO(image_bytes), filename=f"leaderboard.{EXTENSIONS[fmt]}")
+
+def leaderboard_view(page: int, max_pages: int) -> discord.ui.View:
+    """Previous / current page (refresh) / next buttons under a leaderboard image"""
+    view = discord.ui.View(timeout=None)
+    view.add_item(LeaderboardButton("prev", max(1, page - 1), "◀", disabled=page <= 1))
+    view.add_item(LeaderboardButton("page", page, f"{page}/{max_pages}"))
+    view.add_item(LeaderboardButton("next", min(max_pages, page + 1), "▶", disabled=page >= max_pages))
+    return view
 
 class Leveling(commands.Cog):
     """Complete XP and Leveling System like MEE6"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.levels_data = self.load_levels_data()
-        self.settings = self.load_settings()
-        self.cooldowns = {}
+        self.storage = create_storage()
+        # XP tables are loaded per guild on first use and evicted after a flush when cold
+        self.levels_data = GuildCache(self.storage, on_load=self.refresh_levels)
+        # In cluster mode only the settings of guilds on this process's shards are loaded
+        shards = (getattr(bot, "shard_ids", None), getattr(bot, "shard_count", None))
+        self.settings = self.storage.load_settings(*shards)
+        self.cooldowns = CooldownTracker()
+        self.ingest = XPIngestQueue(self.process_xp_batch)
+        self.announcer = LevelUpAnnouncer()
+        self.role_edits = RoleEditQueue()
+        self.reward_sync_state = RewardSyncState(cluster_path(REWARD_SYNC_FILE))
+        self.reward_syncs = {}
+        self.resume_task = None
+        self.compiled_settings = {}
+        self.rank_indexes = {}
+        # guild_id -> IDs of members currently in the guild, for guilds with a rank index
+        self.present = {}
+        self.chunk_tasks = {}
+        # (guild_id, page, fingerprint) -> (image bytes, format), stale fingerprints age out of the LRU
+        self.page_cache = LRUCache(PAGE_CACHE_ENTRIES, PAGE_CACHE_BYTES, sizeof=lambda entry: len(entry[0]))
+        self.encoding = EncodingMetrics()
+        self.avatars = AvatarFetcher()
+        if RENDER_POOL == "process":
+            self.render_pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS)
+        else:
+            self.render_pool = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="leaderboard-render")
+        
+        self.dirty = {}
+        self.dirty_count = 0
+        self.flush_event = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+        self.flush_task = None
+        self.closing = False
+        
+        # Changes that never made it into a snapshot are replayed and re-saved on the next flush
+        self.journal = XPJournal(cluster_path(JOURNAL_FILE))
+        replayed = self.journal.replay(self.levels_data)
+        for guild_id, user_id in replayed:
+            self.mark_dirty(guild_id, user_id)
+        if replayed:
+            print(f"✅ Replayed {len(replayed)} XP change(s) from the journal")
+    
+    async def cog_load(self):
+        # Buttons on leaderboards sent before a restart are routed back here by custom ID
+        self.bot.add_dynamic_items(LeaderboardButton)
+        add_message_handlers(self.bot, self)
+        await self.avatars.start()
+        self.ingest.start()
+        self.flush_task = asyncio.create_task(self.flush_loop())
+        self.role_edits.start()
+        if self.reward_sync_state.jobs:
+            self.resume_task = asyncio.create_task(self.resume_reward_syncs())
+    
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(LeaderboardButton)
+        remove_message_handlers(self.bot, self)
+        # Award what's still queued, let the flush loop finish its current write, then do a final flush
+        await self.ingest.close()
+        self.closing = True
+        self.flush_event.set()
+        if self.flush_task:
+            await self.flush_task
+        await self.flush_levels_data()
+        # Reward syncs already saved their cursor after the last finished chunk
+        tasks = [task for _, task in self.reward_syncs.values()] + list(self.chunk_tasks.values())
+        if self.resume_task:
+            tasks.append(self.resume_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.role_edits.close()
+        await self.announcer.close()
+        await self.avatars.close()
+        self.render_pool.shutdown(wait=False, cancel_futures=True)
+        self.journal.close()
+        self.storage.close()
+    
+    def save_user(self, guild_id, user_id, op: str):
+        """Journal a user's changed record and queue it for the next flush"""
+        self.save_users([(guild_id, user_id)], op)
+    
+    def save_users(self, users, op: str):
+        """save_user for several (guild_id, user_id) pairs, with a single journal write"""
+        entries = [
+            (op, guild_id, user_id, self.levels_data.get(str(guild_id), {}).get(str(user_id)))
+            for guild_id, user_id in users
+        ]
+        self.journal.append_many(entries)
+        for _, guild_id, user_id, record in entries:
+            self.index_user(guild_id, user_id, record)
+            self.mark_dirty(guild_id, user_id)
+    
+    def get_rank_index(self, guild_id):
+        """Get a guild's rank index of present members, building it on first use"""
+        guild_id = str(guild_id)
+        if guild_id not in self.rank_indexes:
+            self.rank_indexes[guild_id] = RankIndex(self.levels_data.get(guild_id, {}), self.get_present(guild_id))
+        return self.rank_indexes[guild_id]
+    
+    def get_present(self, guild_id):
+        """Set of member IDs in a guild, None while its member list isn't known yet
+        
+        Built once from the member cache and then kept current by the join/remove events.
+        Until the guild is chunked everyone with XP is ranked; a chunk request is started
+        and the rank index is rebuilt when it finishes.
+        """
+        guild_id = str(guild_id)
+        present = self.present.get(guild_id)
+        if present is not None:
+            return present
         
-    def load_levels_data(self):
-        """Load user level data from JSON"""
-        if os.path.exists(LEVELS_DATA_FILE):
+        guild = self.bot.get_guild(int(guild_id))
+        if guild is None:
+            return None
+        if guild.chunked:
+            present = self.present[guild_id] = {member.id for member in guild.members}
+            return present
+        if guild_id not in self.chunk_tasks:
+            self.chunk_tasks[guild_id] = asyncio.create_task(self.chunk_guild(guild))
+        return None
+    
+    async def chunk_guild(self, guild: discord.Guild):
+        """Fetch a guild's member list, then rank only present members from then on"""
+        guild_id = str(guild.id)
+        try:
+            await guild.chunk()
+        except Exception as e:
+            print(f"Failed to chunk guild {guild_id}: {e}")
+            return
+        finally:
+            del self.chunk_tasks[guild_id]
+        self.present[guild_id] = {member.id for member in guild.members}
+        self.rank_indexes.pop(guild_id, None)
+    
+    def index_user(self, guild_id, user_id, record):
+        """Keep an already built rank index in step with a user's record"""
+        index = self.rank_indexes.get(str(guild_id))
+        if index is None:
+            return
+        present = self.present.get(str(guild_id))
+        if record is None or (present is not None and int(user_id) not in present):
+            index.remove(user_id)
+        else:
+            index.update(user_id, record["total_xp"])
+    
+    def mark_dirty(self, guild_id, user_id):
+        """Queue a user's record for the next background flush"""
+        guild_dirty = self.dirty.setdefault(str(guild_id), set())
+        user_id = str(user_id)
+        if user_id not in guild_dirty:
+            guild_dirty.add(user_id)
+            self.dirty_count += 1
+            if self.dirty_count >= FLUSH_THRESHOLD:
+                self.flush_event.set()
+    
+    async def flush_loop(self):
+        """Flush dirty XP every FLUSH_INTERVAL seconds or when enough entries pile up"""
+        while not self.closing:
             try:
-                with open(LEVELS_DATA_FILE, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                print("⚠️ levels_data.json corrupted, creating new")
-                return {}
-        return {}
-    
-    def save_levels_data(self):
-        """Save user level data to JSON"""
-        with open(LEVELS_DATA_FILE, 'w') as f:
-            json.dump(self.levels_data, f, indent=4)
-    
-    def load_settings(self):
-        """Load leveling settings from JSON"""
-        if os.path.exists(SETTINGS_DATA_FILE):
+                await asyncio.wait_for(self.flush_event.wait(), timeout=FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_event.clear()
+            await self.flush_levels_data()
+    
+    async def flush_levels_data(self):
+        """Write dirty records to disk off the event loop"""
+        async with self.flush_lock:
+            if not self.dirty:
+                self.evict_cold_guilds()
+                return
+            
+            dirty, self.dirty = self.dirty, {}
+            self.dirty_count = 0
+            journal_seq = self.journal.seal()
+            
+            # Only the dirty records are copied; the storage backend already has the rest
+            changes = {}
+            for guild_id, user_ids in dirty.items():
+                guild_data = self.levels_data.get(guild_id, {})
+                changes[guild_id] = {
+                    user_id: dict(guild_data[user_id]) if user_id in guild_data else None
+                    for user_id in user_ids
+                }
+            
             try:
-                with open(SETTINGS_DATA_FILE, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                print("⚠️ level_settings.json corrupted, creating new")
-                return {}
-        return {}
-    
-    def save_settings(self):
-        """Save leveling settings to JSON"""
-        with open(SETTINGS_DATA_FILE, 'w') as f:
-            json.dump(self.settings, f, indent=4)
+                await asyncio.to_thread(self.storage.write_levels, changes)
+            except Exception as e:
+                # The sealed journal segments stay on disk until a later flush succeeds
+                print(f"❌ Failed to save levels data: {e}")
+                for guild_id, user_ids in dirty.items():
+                    for user_id in user_ids:
+                        self.mark_dirty(guild_id, user_id)
+                return
+            
+            self.journal.truncate(journal_seq)
+            self.evict_cold_guilds()
+    
+    def evict_cold_guilds(self):
+        """Drop the least recently used guilds over the memory budget (call under the flush lock)"""
+        # Guilds changed since the last write stay until a later flush has saved them
+        for guild_id in self.levels_data.evict(self.dirty):
+            self.rank_indexes.pop(guild_id, None)
+            self.present.pop(guild_id, None)
+    
+    def save_settings(self, guild_id):
+        """Save one guild's leveling settings"""
+        guild_id = str(guild_id)
+        self.storage.save_guild_settings(guild_id, self.settings[guild_id])
+        self.compiled_settings.pop(int(guild_id), None)
     
     def get_guild_settings(self, guild_id: int):
-        """Get settings for a specific guild"""
+        """Get the raw settings dict for a guild, to change and then save_settings()"""
         guild_id = str(guild_id)
         if guild_id not in self.settings:
-            self.settings[guild_id] = {
-                "enabled": True,
-                "xp_rate": 1.0,
-                "xp_min": 15,
-                "xp_max": 25,
-                "cooldown": 60,
-                "level_up_channel": None,
-                "level_up_message": "🎉 {user} leveled up to **Level {level}**!",
-                "ignored_channels": [],
-                "ignored_roles": [],
-                "role_rewards": {}
-            }
-            self.save_settings()
+            self.settings[guild_id] = default_settings()
         return self.settings[guild_id]
     
+    def get_compiled_settings(self, guild_id: int) -> GuildSettings:
+        """Get a guild's read-only compiled settings, rebuilt after every save_settings()"""
+        guild_id = int(guild_id)
+        settings = self.compiled_settings.get(guild_id)
+        if settings is None:
+            settings = GuildSettings(self.settings.get(str(guild_id), {}))
+            self.compiled_settings[guild_id] = settings
+        return settings
+    
+    def refresh_levels(self, guild_id, guild_data):
+        """Recompute a freshly loaded guild's stored levels with its curve
+        
+        Levels saved by the old sqrt formula, or before level 1 started at 0 XP, get fixed
+        and saved the first time their guild loads. One vectorized pass, small next to the
+        load itself, and nothing is marked dirty once the stored levels are current.
+        """
+        for user_id in recalculate_levels(guild_data, self.get_curve(guild_id)):
+            self.mark_dirty(guild_id, user_id)
+    
     def get_user_data(self, guild_id: int, user_id: int):
         """Get user XP and level data"""
         guild_id = str(guild_id)
         user_id = str(user_id)
         
         if guild_id not in self.levels_data:
-            self.levels_data[guild_id] = {}
+            self.levels_data[guild_id] = GuildTable()
         
         if user_id not in self.levels_data[guild_id]:
-            self.levels_data[guild_id][user_id] = {
-                "xp": 0,
-                "level": 1,
-                "total_xp": 0,
-                "messages": 0
-            }
-            self.save_levels_data()
+            self.levels_data[guild_id][user_id] = NEW_USER
+            self.index_user(guild_id, user_id, self.levels_data[guild_id][user_id])
+            self.mark_dirty(guild_id, user_id)
         
         return self.levels_data[guild_id][user_id]
     
-    def calculate_level(self, xp: int) -> int:
-        """Calculate level from XP (MEE6 formula)"""
-        level = int((-50 + math.sqrt(max(0, 2500 + 20 * xp - 400))) / 10)
-        return max(1, level)
+    async def bulk_import(self, guild_id, rows, mode: str = "set") -> int:
+        """Set ("set") or add to ("add") the XP of many users, then flush once
+        
+        rows are (user_id, total_xp, messages or None) tuples, pulled a chunk at a time
+        in a worker thread so a lazily parsed file never blocks the event loop. The flush
+        lock is held until every row is applied, so the background flush can't write half
+        an import: it reaches storage in the one flush at the end or not at all.
+        """
+        guild_id = str(guild_id)
+        curve = self.get_curve(guild_id)
+        rows = iter(rows)
+        
+        count = 0
+        async with self.flush_lock:
+            # Eviction also runs under the flush lock, so the table stays resident throughout
+            guild_data = await self.levels_data.ensure_loaded(guild_id)
+            while True:
+                chunk = await asyncio.to_thread(read_chunk, rows)
+                if not chunk:
+                    break
+                for user_id, xp, messages in chunk:
+                    user_id = str(user_id)
+                    if user_id not in guild_data:
+                        guild_data[user_id] = NEW_USER
+                    data = guild_data[user_id]
+                    if mode == "add":
+                        data["xp"] += xp
+                        data["total_xp"] = max(0, data["total_xp"] + xp)
+                        if messages is not None:
+                            data["messages"] += messages
+                    else:
+                        data["xp"] = xp
+                        data["total_xp"] = max(0, xp)
+                        if messages is not None:
+                            data["messages"] = messages
+                    data["level"] = curve.level_for(data["total_xp"])
+                    self.mark_dirty(guild_id, user_id)
+                    count += 1
+        
+        # Cheaper to rebuild the rank index on next use than to update it row by row
+        self.rank_indexes.pop(guild_id, None)
+        await self.flush_levels_data()
+        return count
+    
+    async def bulk_adjust(self, guild_id, multiplier: float = 1.0, offset: int = 0) -> int:
+        """Apply xp * multiplier + offset to every user in a guild, then flush once
+        
+        Raises ValueError, leaving the guild untouched, if any result would pass MAX_XP.
+        """
+        guild_id = str(guild_id)
+        guild_data = await self.levels_data.ensure_loaded(guild_id)
+        if not guild_data:
+            return 0
+        
+        xp = guild_data.column_view("xp")
+        total_xp = guild_data.column_view("total_xp")
+        # Worked out in float first so an overflowing result is caught instead of wrapping around
+        new_xp = xp * multiplier + offset
+        new_total_xp = np.maximum(total_xp * multiplier + offset, 0)
+        if len(new_xp) and max(np.abs(new_xp).max(), new_total_xp.max()) > MAX_XP:
+            raise ValueError(f"That would take someone past {MAX_XP:,} XP")
+        
+        # Updated in place on the table's columns; free rows are zeroed again on reuse
+        xp[:] = new_xp.astype(np.int64)
+        total_xp[:] = new_total_xp.astype(np.int64)
+        guild_data.column_view("level")[:] = self.get_curve(guild_id).levels_for(total_xp)
+        del xp, total_xp
+        
+        for user_id in guild_data:
+            self.mark_dirty(guild_id, user_id)
+        
+        self.rank_indexes.pop(guild_id, None)
+        await self.flush_levels_data()
+        return len(guild_data)
+    
+    async def export_guild(self, guild_id, fmt: str = "csv"):
+        """Stream a guild's saved XP data into a spooled temp file (CSV or NDJSON)"""
+        await self.flush_levels_data()
+        # Holding the flush lock keeps the storage backend's copy still while we read it
+        async with self.flush_lock:
+            records = self.storage.iter_guild(str(guild_id))
+            return await asyncio.to_thread(write_rows, iter_export_rows(records), EXPORT_FIELDS, fmt)
     
-    def xp_for_level(self, level: int) -> int:
-        """Calculate XP needed for a specific level"""
-        return 5 * (level ** 2) + (50 * level) + 100
+    async def export_leaderboard(self, guild: discord.Guild, fmt: str = "csv"):
+        """Stream a guild's full ranking with display names into a spooled temp file (CSV or NDJSON)
+        
+        Ranked like /leaderboard: once the member list is known, members who left are left out.
+        """
+        def display_name(user_id):
+            # A single dict lookup in the member cache, safe from the writer thread
+            member = guild.get_member(user_id)
+            return member.display_name if member else ""
+        
+        # A copy, the join/remove events keep changing the live set while the writer thread runs
+        present = self.get_present(guild.id)
+        present = frozenset(present) if present is not None else None
+        
+        await self.flush_levels_data()
+        async with self.flush_lock:
+            records = self.storage.iter_ranked(str(guild.id))
+            rows = iter_leaderboard_rows(records, display_name, present)
+            return await asyncio.to_thread(write_rows, rows, LEADERBOARD_FIELDS, fmt)
     
-    async def fetch_avatar(self, user: discord.Member, size: int = 128):
-        """Download and return user avatar as PIL Image"""
-        try:
-            avatar_url = user.display_avatar.url
-            response = requests.get(avatar_url, timeout=5)
-            avatar = Image.open(io.BytesIO(response.content)).convert('RGBA')
-            avatar = avatar.resize((size, size), Image.Resampling.LANCZOS)
-            
-            mask = Image.new('L', (size, size), 0)
-            draw = ImageDraw.Draw(mask)
-            draw.ellipse((0, 0, size, size), fill=255)
-            
-            output = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-            output.paste(avatar, (0, 0))
-            output.putalpha(mask)
-            
-            return output
-        except:
-            img = Image.new('RGBA', (size, size), (128, 128, 128, 255))
-            mask = Image.new('L', (size, size), 0)
-            draw = ImageDraw.Draw(mask)
-            draw.ellipse((0, 0, size, size), fill=255)
-            img.putalpha(mask)
-            return img
+    def get_curve(self, guild_id):
+        """Get the level curve a guild uses"""
+        return CURVES.get(self.get_compiled_settings(guild_id).level_curve, CURVES[DEFAULT_CURVE])
+    
+    def calculate_level(self, guild_id: int, xp: int) -> int:
+        """Calculate level from total XP"""
+        return self.get_curve(guild_id).level_for(xp)
+    
+    def xp_for_level(self, guild_id: int, level: int) -> int:
+        """Total XP at which a level starts"""
+        return self.get_curve(guild_id).threshold(level)
+    
+    def leaderboard_pages(self, guild_id) -> int:
+        return math.ceil(len(self.get_rank_index(guild_id)) / LEADERBOARD_PAGE_SIZE)
     
     async def generate_leaderboard_image(self, guild: discord.Guild, page: int = 1):
-        """Generate leaderboard image"""
-        guild_data = self.levels_data.get(str(guild.id), {})
+        """Generate a leaderboard page as a discord.File, in whichever format encoded smallest"""
+        guild_data = await self.levels_data.ensure_loaded(guild.id)
         
         if not guild_data:
             return None
         
-        sorted_users = sorted(
-            guild_data.items(),
-            key=lambda x: x[1]["total_xp"],
-            reverse=True
-        )
+        rank_index = self.get_rank_index(guild.id)
         
-        per_page = 10
-        max_pages = math.ceil(len(sorted_users) / per_page)
+        per_page = LEADERBOARD_PAGE_SIZE
+        max_pages = self.leaderboard_pages(guild.id)
         page = max(1, min(page, max_pages))
         
         start_idx = (page - 1) * per_page
         end_idx = start_idx + per_page
-        page_users = sorted_users[start_idx:end_idx]
+        page_users = [(str(user_id), guild_data[str(user_id)]) for user_id in rank_index.page(start_idx, end_idx)]
         
-        width = 800
-        header_height = 80
-        row_height = 80
-        height = header_height + (len(page_users) * row_height) + 30
-        
-        # Create solid dark base
-        img = Image.new('RGB', (width, height), '#0f1014')
-        
-        # Load background VERY subtle (only 15% visible)
-        try:
-            if os.path.exists(BACKGROUND_IMAGE):
-                bg = Image.open(BACKGROUND_IMAGE).convert('RGB')
-                bg = bg.resize((width, height), Image.Resampling.LANCZOS)
-                # Apply heavy blur for aesthetic
-                bg = bg.filter(ImageFilter.GaussianBlur(radius=3))
-                # Only 15% opacity - VERY subtle
-                img = Image.blend(img, bg, 0.15)
-        except Exception as e:
-            print(f"Background load error: {e}")
-        
-        draw = ImageDraw.Draw(img)
-        
-        try:
-            title_font = ImageFont.truetype("arial.ttf", 38)
-            name_font = ImageFont.truetype("arialbd.ttf", 24)
-            stats_font = ImageFont.truetype("arial.ttf", 17)
-        except:
-            title_font = ImageFont.load_default()
-            name_font = ImageFont.load_default()
-            stats_font = ImageFont.load_default()
-        
-        # Header with slight transparency
-        draw.rectangle([(0, 0), (width, header_height)], fill=(20, 22, 26))
-        
-        title_text = "🏆 Leaderboard"
-        try:
-            title_bbox = draw.textbbox((0, 0), title_text, font=title_font)
-            title_width = title_bbox[2] - title_bbox[0]
-        except:
-            title_width = len(title_text) * 19
-        
-        draw.text(((width - title_width) // 2, 15), title_text, fill='#FFD700', font=title_font)
-        
-        page_text = f"Page {page}/{max_pages}"
-        try:
-            page_bbox = draw.textbbox((0, 0), page_text, font=stats_font)
-            page_width = page_bbox[2] - page_bbox[0]
-        except:
-            page_width = len(page_text) * 9
+        # Everything drawn on the page; any change in XP, level, name or avatar misses the cache
+        fingerprint = [max_pages]
+        members = {}
+        for user_id, data in page_users:
+            member = guild.get_member(int(user_id))
+            if member:
+                members[user_id] = member
+                fingerprint.append((user_id, data["total_xp"], data["level"], member.display_name, member.display_avatar.key))
+            else:
+                fingerprint.append(None)
+        fingerprint = tuple(fingerprint)
         
-        draw.text(((width - page_width) // 2, 56), page_text, fill='#72767d', font=stats_font)
+        cache_key = (guild.id, page, fingerprint)
+        cached = self.page_cache.get(cache_key)
+        if cached is not None:
+            return leaderboard_file(*cached)
         
-        y_offset = header_height + 12
+        # Download every avatar on the page at once instead of one row at a time
+        avatars = dict(zip(members, await self.avatars.fetch_many(members.values(), 52)))
         
-        for idx, (user_id, data) in enumerate(page_users, start=start_idx + 1):
-            member = guild.get_member(int(user_id))
+        rows = []
+        for slot, (user_id, data) in enumerate(page_users):
+            member = members.get(user_id)
             if not member:
                 continue
             
-            row_y = y_offset + ((idx - start_idx - 1) * row_height)
-            
-            # Much darker rows with better contrast
-            if idx % 2 == 0:
-                row_bg = (18, 20, 24)
-            else:
-                row_bg = (22, 24, 28)
-            
-            # Draw row with rounded corners
-            draw.rounded_rectangle([(12, row_y), (width - 12, row_y + row_height - 8)], 
-                                radius=8, fill=row_bg, outline='#2f3136', width=2)
-            
-            # Rank
-            if idx == 1:
-                rank_text = "🥇"
-                rank_color = '#FFD700'
-            elif idx == 2:
-                rank_text = "🥈"
-                rank_color = '#C0C0C0'
-            elif idx == 3:
-                rank_text = "🥉"
-                rank_color = '#CD7F32'
-            else:
-                rank_text = f"#{idx}"
-                rank_color = '#72767d'
-            
-            draw.text((28, row_y + 24), rank_text, fill=rank_color, font=name_font)
-            
-            # Avatar
-            avatar = await self.fetch_avatar(member, size=52)
-            img.paste(avatar, (85, row_y + 14), avatar)
-            
-            # Username
-            username = member.display_name[:17]
-            draw.text((150, row_y + 12), username, fill='#FFFFFF', font=name_font)
-            
-            # Stats
-            level_text = f"Lvl {data['level']}"
-            xp_text = f"{data['total_xp']:,} XP"
-            
-            draw.text((150, row_y + 42), level_text, fill='#5865f2', font=stats_font)
-            draw.text((250, row_y + 42), xp_text, fill='#3ba55d', font=stats_font)
-            
-            # Progress bar
-            bar_x = 470
-            bar_y = row_y + 24
-            bar_width = 290
-            bar_height = 24
-            
             current_level = data['level']
             current_xp = data['total_xp']
-            xp_for_current = self.xp_for_level(current_level)
-            xp_for_next = self.xp_for_level(current_level + 1)
+            xp_for_current = self.xp_for_level(guild.id, current_level)
+            xp_for_next = self.xp_for_level(guild.id, current_level + 1)
             xp_progress = max(0, current_xp - xp_for_current)
             xp_needed = max(1, xp_for_next - xp_for_current)
-            progress = min(max(xp_progress / xp_needed, 0), 1.0)
-            
-            # Progress background
-            draw.rounded_rectangle([(bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height)], 
-                                radius=12, fill='#0f1014', outline='#2f3136', width=1)
             
-            # Progress fill with gradient effect
-            if progress > 0:
-                fill_width = max(int(bar_width * progress), 24)
-                # Create gradient by drawing multiple rectangles
-                for i in range(fill_width):
-                    alpha = 1.0 - (i / fill_width) * 0.2
-                    r = int(88 * alpha)
-                    g = int(101 * alpha)
-                    b = int(242 * alpha)
-                    draw.rectangle([(bar_x + i, bar_y + 1), (bar_x + i + 1, bar_y + bar_height - 1)], 
-                                fill=(r, g, b))
-                
-                # Round the fill
-                draw.rounded_rectangle([(bar_x, bar_y), (bar_x + fill_width, bar_y + bar_height)], 
-                                    radius=12, outline=None)
-            
-            # Progress text
-            progress_text = f"{int(progress * 100)}%"
-            try:
-                progress_bbox = draw.textbbox((0, 0), progress_text, font=stats_font)
-                progress_width = progress_bbox[2] - progress_bbox[0]
-            except:
-                progress_width = len(progress_text) * 8
-            
-            draw.text((bar_x + (bar_width - progress_width) // 2, bar_y + 5), 
-                    progress_text, fill='#FFFFFF', font=stats_font)
-        
-        output = io.BytesIO()
-        img.save(output, format='PNG', quality=98)
-        output.seek(0)
-        
-        return output
-
+            rows.append({
+                "rank": start_idx + slot + 1,
+                "slot": slot,
+                "name": member.display_name,
+                "level": current_level,
+                "total_xp": current_xp,
+                "progress": min(max(xp_progress / xp_needed, 0), 1.0),
+                "avatar": avatars[user_id].tobytes(),
+                "avatar_size": 52,
+                "avatar_key": member.display_avatar.key
+            })
+        
+        page_data = {"page": page, "max_pages": max_pages, "row_count": len(page_users), "rows": rows}
+        
+        # Pillow work happens in the render pool so the gateway loop keeps running
+        loop = asyncio.get_running_loop()
+        image_bytes, fmt, timings = await loop.run_in_executor(self.render_pool, render_leaderboard, page_data)
+        self.encoding.record(len(image_bytes), fmt, timings)
+        
+        self.page_cache.put(cache_key, (image_bytes, fmt))
+        
+        return leaderboard_file(image_bytes, fmt)
+    
     @commands.Cog.listener()
-    async def on_message(self, message):
-        """Award XP on message"""
-        if message.author.bot:
-            return
-        
-        if not message.guild:
-            return
-        
-        guild_id = message.guild.id
-        user_id = message.author.id
-        
-        settings = self.get_guild_settings(guild_id)
-        
-        if not settings["enabled"]:
+    async def on_member_join(self, member: discord.Member):
+        """Put a returning member back into the ranking with the XP they had"""
+        guild_id = str(member.guild.id)
+        present = self.present.get(guild_id)
+        if present is None:
             return
+        present.add(member.id)
         
-        if message.channel.id in settings["ignored_channels"]:
+        index = self.rank_indexes.get(guild_id)
+        if index is None:
             return
-        
-        user_role_ids = [role.id for role in message.author.roles]
-        if any(role_id in settings["ignored_roles"] for role_id in user_role_ids):
+        guild_data = await self.levels_data.ensure_loaded(guild_id)
+        record = guild_data.get(member.id)
+        if record is not None:
+            index.update(member.id, record["total_xp"])
+    
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent):
+        """Take a departed member out of the ranking; their XP record is kept"""
+        guild_id = str(payload.guild_id)
+        present = self.present.get(guild_id)
+        if present is None:
             return
+        present.discard(payload.user.id)
         
-        cooldown_key = f"{guild_id}:{user_id}"
-        current_time = datetime.now()
-        
-        if cooldown_key in self.cooldowns:
-            last_time = self.cooldowns[cooldown_key]
-            if (current_time - last_time).total_seconds() < settings["cooldown"]:
-                return
-        
-        self.cooldowns[cooldown_key] = current_time
-        
-        user_data = self.get_user_data(guild_id, user_id)
-        
-        base_xp = random.randint(settings["xp_min"], settings["xp_max"])
-        xp_gain = int(base_xp * settings["xp_rate"])
-        
-        old_level = user_data["level"]
-        user_data["xp"] += xp_gain
-        user_data["total_xp"] = max(0, user_data["total_xp"] + xp_gain)
-        user_data["messages"] += 1
-        
-        new_level = self.calculate_level(user_data["total_xp"])
-        user_data["level"] = new_level
-        
-        self.save_levels_data()
+        index = self.rank_indexes.get(guild_id)
+        if index is not None:
+            index.remove(payload.user.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.present.pop(str(guild.id), None)
+    
+    @message_handler()
+    async def queue_message_xp(self, message):
+        """Queue the message for XP; awards are applied in batches by process_xp_batch"""
+        # Member._roles holds the raw role IDs, so no Role objects get built here
+        await self.ingest.offer((
+            message.guild, message.author, message.channel,
+            getattr(message.author, "_roles", ()), time.monotonic()
+        ))
+    
+    async def process_xp_batch(self, batch):
+        """Award XP for a batch of queued messages, journalling every change with one write"""
+        # Cold guilds are read in a worker thread before anything in the batch is awarded
+        for guild_id in {guild.id for guild, *_ in batch if self.get_compiled_settings(guild.id).enabled}:
+            try:
+                await self.levels_data.ensure_loaded(guild_id)
+            except Exception as e:
+                print(f"Failed to load XP data for guild {guild_id}: {e}")
         
-        if new_level > old_level:
-            await self.handle_level_up(message, new_level, settings)
+        awarded = {}
+        level_ups = []
+        try:
+            for guild, member, channel, role_ids, timestamp in batch:
+                # One bad message (or guild) mustn't cost the rest of the batch their XP
+                try:
+                    guild_id = guild.id
+                    user_id = member.id
+                    
+                    settings = self.get_compiled_settings(guild_id)
+                    
+                    if not settings.enabled:
+                        continue
+                    
+                    if channel.id in settings.ignored_channels:
+                        continue
+                    
+                    if settings.ignored_roles and not settings.ignored_roles.isdisjoint(role_ids):
+                        continue
+                    
+                    # Cooldowns run on arrival time, however long the message sat in the queue
+                    if not self.cooldowns.try_acquire(guild_id, user_id, settings.cooldown, timestamp):
+                        continue
+                    
+                    user_data = self.get_user_data(guild_id, user_id)
+                    awarded[(guild_id, user_id)] = None
+                    
+                    base_xp = random.randint(settings.xp_min, settings.xp_max)
+                    xp_gain = int(base_xp * settings.xp_rate)
+                    
+                    old_level = user_data["level"]
+                    user_data["xp"] += xp_gain
+                    user_data["total_xp"] = max(0, user_data["total_xp"] + xp_gain)
+                    user_data["messages"] += 1
+                    
+                    new_level = self.calculate_level(guild_id, user_data["total_xp"])
+                    user_data["level"] = new_level
+                    
+                    if new_level > old_level:
+                        level_ups.append((guild, member, channel, new_level, settings))
+                except Exception as e:
+                    print(f"XP award for {member.id} in {guild.id} failed: {e}")
+        finally:
+            # Whatever was applied gets journalled and flushed, even if the loop was cut short
+            self.save_users(awarded, "award")
+        
+        for level_up in level_ups:
+            self.handle_level_up(*level_up)
     
-    async def handle_level_up(self, message, new_level, settings):
-        """Handle level up event"""
-        level_up_msg = settings["level_up_message"].format(
-            user=message.author.mention,
+    def handle_level_up(self, guild, member, channel, new_level, settings):
+        """Queue the level up announcement and role reward without waiting on Discord"""
+        level_up_msg = settings.level_up_message.format(
+            user=member.mention,
             level=new_level,
-            server=message.guild.name
+            server=guild.name
         )
         
-        if settings["level_up_channel"]:
-            channel = message.guild.get_channel(settings["level_up_channel"])
-            if channel:
-                await channel.send(level_up_msg)
-            else:
-                await message.channel.send(level_up_msg)
-        else:
-            await message.channel.send(level_up_msg)
+        announce_channel = None
+        if settings.level_up_channel:
+            announce_channel = guild.get_channel(settings.level_up_channel)
+        self.announcer.announce(announce_channel or channel, member.id, member.mention, new_level, level_up_msg)
         
-        if str(new_level) in settings["role_rewards"]:
-            role_id = settings["role_rewards"][str(new_level)]
-            role = message.guild.get_role(role_id)
-            if role:
-                try:
-                    await message.author.add_roles(role)
-                    await message.channel.send(f"🎁 {message.author.mention} earned the **{role.name}** role!")
-                except discord.Forbidden:
-                    pass
+        if settings.reward_roles:
+            self.sync_member_rewards(guild, member, new_level, channel)
+    
+    def sync_member_rewards(self, guild, member, level: int, announce_channel=None):
+        """Queue the reward role changes for a member's level, every reward up to it and none above
+        
+        Newly earned roles are announced in announce_channel once they are granted.
+        """
+        add, remove = plan_member(guild, member, level, self.get_compiled_settings(guild.id))
+        if not add and not remove:
+            return
+        future = self.role_edits.submit(member, add, remove)
+        
+        if announce_channel is not None and add:
+            def announce(future):
+                if future.cancelled() or future.exception() is not None or not future.result():
+                    return
+                names = join_names([f"**{role.name}**" for role in add])
+                self.announcer.announce_reward(
+                    announce_channel, f"🎁 {member.mention} earned the {names} role{'s' if len(add) > 1 else ''}!"
+                )
+            future.add_done_callback(announce)
+    
+    def member_level(self, member) -> int:
+        """Stored level of a member, 0 if they have no XP record"""
+        record = self.levels_data.get(str(member.guild.id), {}).get(member.id)
+        return record["level"] if record is not None else 0
+    
+    def start_reward_sync(self, guild, state: dict = None) -> RewardSyncJob:
+        """Start reconciling a guild's reward roles, or return the sync already running"""
+        if guild.id in self.reward_syncs:
+            return self.reward_syncs[guild.id][0]
+        
+        job = RewardSyncJob(guild, state)
+        task = asyncio.create_task(self.run_reward_sync(job, guild))
+        self.reward_syncs[guild.id] = (job, task)
+        
+        def finished(task):
+            self.reward_syncs.pop(guild.id, None)
+            if not task.cancelled() and task.exception() is not None:
+                print(f"Reward role sync failed in {guild.id}: {task.exception()}")
+        task.add_done_callback(finished)
+        return job
+    
+    async def run_reward_sync(self, job: RewardSyncJob, guild):
+        # member_level reads the table synchronously, so load it off the event loop first
+        await self.levels_data.ensure_loaded(guild.id)
+        await job.run(
+            self.role_edits,
+            self.member_level,
+            lambda: self.get_compiled_settings(guild.id),
+            self.reward_sync_state.save
+        )
+    
+    async def resume_reward_syncs(self):
+        """Pick up reward syncs a restart cut short, once the member caches are filled"""
+        await self.bot.wait_until_ready()
+        for guild_id, state in list(self.reward_sync_state.jobs.items()):
+            guild = self.bot.get_guild(int(guild_id))
+            if guild:
+                self.start_reward_sync(guild, state)
+                print(f"✅ Resumed reward role sync in {guild.name}")
     
     @app_commands.command(name="rank", description="Check your or someone's rank and level")
     @app_commands.describe(member="Member to check (leave empty for yourself)")
@@ -391,21 +719,15 @@ class Leveling(commands.Cog):
             await interaction.response.send_message("❌ Bots don't have levels!", ephemeral=True)
             return
         
+        await self.levels_data.ensure_loaded(interaction.guild.id)
         user_data = self.get_user_data(interaction.guild.id, target.id)
         
-        guild_data = self.levels_data.get(str(interaction.guild.id), {})
-        sorted_users = sorted(
-            guild_data.items(),
-            key=lambda x: x[1]["total_xp"],
-            reverse=True
-        )
-        
-        rank = next((i + 1 for i, (uid, _) in enumerate(sorted_users) if uid == str(target.id)), 0)
+        rank = self.get_rank_index(interaction.guild.id).rank(target.id)
         
         current_level = user_data["level"]
         current_xp = max(0, user_data["total_xp"])
-        xp_for_current = self.xp_for_level(current_level)
-        xp_for_next = self.xp_for_level(current_level + 1)
+        xp_for_current = self.xp_for_level(interaction.guild.id, current_level)
+        xp_for_next = self.xp_for_level(interaction.guild.id, current_level + 1)
         xp_progress = max(0, current_xp - xp_for_current)
         xp_needed = max(1, xp_for_next - xp_for_current)
         
@@ -434,20 +756,35 @@ class Leveling(commands.Cog):
         """Show XP leaderboard with image"""
         await interaction.response.defer()
         
-        guild_data = self.levels_data.get(str(interaction.guild.id), {})
+        guild_data = await self.levels_data.ensure_loaded(interaction.guild.id)
         
         if not guild_data:
             await interaction.followup.send("❌ No one has earned XP yet!", ephemeral=True)
             return
         
-        image_bytes = await self.generate_leaderboard_image(interaction.guild, page)
+        file = await self.generate_leaderboard_image(interaction.guild, page)
         
-        if image_bytes is None:
+        if file is None:
             await interaction.followup.send("❌ Failed to generate leaderboard!", ephemeral=True)
             return
         
-        file = discord.File(image_bytes, filename="leaderboard.png")
-        await interaction.followup.send(file=file)
+        max_pages = self.leaderboard_pages(interaction.guild.id)
+        page = max(1, min(page, max_pages))
+        await interaction.followup.send(file=file, view=leaderboard_view(page, max_pages))
+    
+    async def show_leaderboard_page(self, interaction: discord.Interaction, page: int):
+        """Swap the image on a leaderboard message for another page (button presses)"""
+        await interaction.response.defer()
+        
+        file = await self.generate_leaderboard_image(interaction.guild, page)
+        if file is None:
+            await interaction.followup.send("❌ No one has earned XP yet!", ephemeral=True)
+            return
+        
+        # The leaderboard may have shrunk since the buttons were made
+        max_pages = self.leaderboard_pages(interaction.guild.id)
+        page = max(1, min(page, max_pages))
+        await interaction.edit_original_response(attachments=[file], view=leaderboard_view(page, max_pages))
     
     @app_commands.command(name="xp-add", description="Add XP to a user (Admin only)")
     @app_commands.describe(member="Member to give XP", amount="Amount of XP to add")
@@ -457,16 +794,18 @@ class Leveling(commands.Cog):
             await interaction.response.send_message("❌ Can't give XP to bots!", ephemeral=True)
             return
         
+        await self.levels_data.ensure_loaded(interaction.guild.id)
         user_data = self.get_user_data(interaction.guild.id, member.id)
         old_level = user_data["level"]
         
         user_data["xp"] += amount
         user_data["total_xp"] = max(0, user_data["total_xp"] + amount)
         
-        new_level = self.calculate_level(user_data["total_xp"])
+        new_level = self.calculate_level(interaction.guild.id, user_data["total_xp"])
         user_data["level"] = new_level
         
-        self.save_levels_data()
+        self.save_user(interaction.guild.id, member.id, "add")
+        self.sync_member_rewards(interaction.guild, member, new_level)
         
         embed = discord.Embed(title="✅ XP Added", description=f"Added **{amount} XP** to {member.mention}", color=discord.Color.green())
         embed.add_field(name="Total XP", value=f"{user_data['total_xp']:,}", inline=True)
@@ -482,16 +821,18 @@ class Leveling(commands.Cog):
             await interaction.response.send_message("❌ Bots don't have XP!", ephemeral=True)
             return
         
+        await self.levels_data.ensure_loaded(interaction.guild.id)
         user_data = self.get_user_data(interaction.guild.id, member.id)
         old_level = user_data["level"]
         
         user_data["xp"] = max(0, user_data["xp"] - amount)
         user_data["total_xp"] = max(0, user_data["total_xp"] - amount)
         
-        new_level = self.calculate_level(user_data["total_xp"])
+        new_level = self.calculate_level(interaction.guild.id, user_data["total_xp"])
         user_data["level"] = new_level
         
-        self.save_levels_data()
+        self.save_user(interaction.guild.id, member.id, "remove")
+        self.sync_member_rewards(interaction.guild, member, new_level)
         
         embed = discord.Embed(title="✅ XP Removed", description=f"Removed **{amount} XP** from {member.mention}", color=discord.Color.orange())
         embed.add_field(name="Total XP", value=f"{user_data['total_xp']:,}", inline=True)
@@ -507,13 +848,15 @@ class Leveling(commands.Cog):
             await interaction.response.send_message("❌ Can't set XP for bots!", ephemeral=True)
             return
         
+        await self.levels_data.ensure_loaded(interaction.guild.id)
         user_data = self.get_user_data(interaction.guild.id, member.id)
         
         user_data["xp"] = amount
         user_data["total_xp"] = max(0, amount)
-        user_data["level"] = self.calculate_level(user_data["total_xp"])
+        user_data["level"] = self.calculate_level(interaction.guild.id, user_data["total_xp"])
         
-        self.save_levels_data()
+        self.save_user(interaction.guild.id, member.id, "set")
+        self.sync_member_rewards(interaction.guild, member, user_data["level"])
         
         await interaction.response.send_message(
             f"✅ Set {member.mention}'s XP to **{amount:,}** (Level {user_data['level']})"
@@ -530,9 +873,11 @@ class Leveling(commands.Cog):
         guild_id = str(interaction.guild.id)
         user_id = str(member.id)
         
-        if guild_id in self.levels_data and user_id in self.levels_data[guild_id]:
-            del self.levels_data[guild_id][user_id]
-            self.save_levels_data()
+        guild_data = await self.levels_data.ensure_loaded(guild_id)
+        if user_id in guild_data:
+            del guild_data[user_id]
+            self.save_user(guild_id, user_id, "reset")
+        self.sync_member_rewards(interaction.guild, member, 0)
         
         await interaction.response.send_message(f"✅ Reset {member.mention}'s XP and level")
     
@@ -558,12 +903,13 @@ class Leveling(commands.Cog):
             settings["xp_rate"] = max(0.1, min(10.0, xp_rate))
         if xp_min is not None:
             settings["xp_min"] = max(1, xp_min)
+            settings["xp_max"] = max(settings["xp_min"], settings["xp_max"])
         if xp_max is not None:
             settings["xp_max"] = max(settings["xp_min"], xp_max)
         if cooldown is not None:
             settings["cooldown"] = max(0, cooldown)
         
-        self.save_settings()
+        self.save_settings(interaction.guild.id)
         
         embed = discord.Embed(title="⚙️ XP Configuration", color=discord.Color.blue())
         embed.add_field(name="XP Rate", value=f"{settings['xp_rate']}x", inline=True)
@@ -577,7 +923,7 @@ class Leveling(commands.Cog):
     async def xp_toggle(self, interaction: discord.Interaction):
         settings = self.get_guild_settings(interaction.guild.id)
         settings["enabled"] = not settings["enabled"]
-        self.save_settings()
+        self.save_settings(interaction.guild.id)
         
         status = "✅ Enabled" if settings["enabled"] else "❌ Disabled"
         await interaction.response.send_message(f"{status} XP system")
@@ -595,7 +941,7 @@ class Leveling(commands.Cog):
             settings["ignored_channels"].append(channel.id)
             await interaction.response.send_message(f"❌ {channel.mention} will no longer earn XP")
         
-        self.save_settings()
+        self.save_settings(interaction.guild.id)
     
     @app_commands.command(name="xp-role-reward", description="Set role reward for level (Admin only)")
     @app_commands.describe(level="Level to award role at", role="Role to award")
@@ -603,9 +949,193 @@ class Leveling(commands.Cog):
     async def xp_role_reward(self, interaction: discord.Interaction, level: int, role: discord.Role):
         settings = self.get_guild_settings(interaction.guild.id)
         settings["role_rewards"][str(level)] = role.id
-        self.save_settings()
+        self.save_settings(interaction.guild.id)
+        
+        await interaction.response.send_message(
+            f"✅ Set {role.mention} as reward for reaching Level {level}\n"
+            f"Run `/xp-sync-roles` to give it to members who are already past that level"
+        )
+    
+    @app_commands.command(name="xp-sync-roles", description="Give every member the reward roles for their level (Admin only)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def xp_sync_roles(self, interaction: discord.Interaction):
+        await interaction.response.defer()
+        guild = interaction.guild
+        
+        if guild.id in self.reward_syncs:
+            job = self.reward_syncs[guild.id][0]
+            await interaction.followup.send(f"🔄 A reward role sync is already running: {job.progress()}")
+            return
+        
+        job = self.start_reward_sync(guild, self.reward_sync_state.get(guild.id))
+        task = self.reward_syncs[guild.id][1]
+        message = await interaction.followup.send(f"🔄 Syncing reward roles: {job.progress()}", wait=True)
+        
+        # Progress updates until the job ends; the job carries on if the interaction expires
+        while not task.done():
+            await asyncio.wait({task}, timeout=REWARD_PROGRESS_INTERVAL)
+            if not task.done():
+                content = f"🔄 Syncing reward roles: {job.progress()}"
+            elif job.done:
+                content = f"✅ Reward roles synced: {job.progress()}"
+            else:
+                content = f"❌ Reward role sync stopped, run the command again to resume: {job.progress()}"
+            try:
+                await message.edit(content=content)
+            except discord.HTTPException:
+                return
+    
+    @app_commands.command(name="xp-recalculate", description="Recalculate every member's level (Admin only)")
+    @app_commands.describe(curve="Level curve to switch to (default: keep the current one)")
+    @app_commands.choices(curve=[app_commands.Choice(name=name, value=name) for name in CURVES])
+    @app_commands.checks.has_permissions(administrator=True)
+    async def xp_recalculate(self, interaction: discord.Interaction, curve: Optional[app_commands.Choice[str]] = None):
+        await interaction.response.defer()
+        guild_id = str(interaction.guild.id)
+        
+        if curve is not None:
+            settings = self.get_guild_settings(guild_id)
+            settings["level_curve"] = curve.value
+            self.save_settings(guild_id)
+        
+        guild_data = await self.levels_data.ensure_loaded(guild_id)
+        changed = recalculate_levels(guild_data, self.get_curve(guild_id))
+        for user_id in changed:
+            self.mark_dirty(guild_id, user_id)
+        await self.flush_levels_data()
+        
+        await interaction.followup.send(
+            f"✅ Recalculated levels with the **{self.get_curve(guild_id).name}** curve: "
+            f"{len(changed):,} of {len(guild_data):,} member(s) changed level"
+        )
+    
+    @app_commands.command(name="xp-import", description="Import XP from a CSV or JSON lines file (Admin only)")
+    @app_commands.describe(
+        file="CSV with user_id,total_xp[,messages] or one JSON object per line",
+        mode="Replace members' XP or add to it"
+    )
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="set", value="set"),
+        app_commands.Choice(name="add", value="add")
+    ])
+    @app_commands.checks.has_permissions(administrator=True)
+    async def xp_import(self, interaction: discord.Interaction, file: discord.Attachment, mode: Optional[app_commands.Choice[str]] = None):
+        await interaction.response.defer()
+        
+        try:
+            fmt = format_for_filename(file.filename)
+            spool = await download_to_spool(file.url)
+        except BulkFormatError as e:
+            await interaction.followup.send(f"❌ Import failed: {e}", ephemeral=True)
+            return
+        except aiohttp.ClientError as e:
+            await interaction.followup.send(f"❌ Couldn't download the file: {e}", ephemeral=True)
+            return
+        
+        try:
+            # One parsing pass before touching any data so a bad line aborts the whole import,
+            # then a second one that applies the rows as they're read
+            await asyncio.to_thread(count_import_rows, spool, fmt)
+            count = await self.bulk_import(interaction.guild.id, iter_import_rows(spool, fmt), mode.value if mode else "set")
+        except (BulkFormatError, UnicodeDecodeError) as e:
+            await interaction.followup.send(f"❌ Import failed: {e}", ephemeral=True)
+            return
+        finally:
+            spool.close()
+        await interaction.followup.send(f"✅ Imported XP for **{count:,}** member(s)")
+    
+    @app_commands.command(name="xp-bulk", description="Adjust everyone's XP at once (Admin only)")
+    @app_commands.describe(multiplier="Multiply everyone's XP (e.g., 0.5 halves it)", offset="Add this much XP to everyone")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def xp_bulk(self, interaction: discord.Interaction, multiplier: Optional[float] = 1.0, offset: Optional[int] = 0):
+        await interaction.response.defer()
+        
+        multiplier = max(0.1, min(10.0, multiplier))
+        offset = max(-MAX_XP, min(MAX_XP, offset))
+        try:
+            count = await self.bulk_adjust(interaction.guild.id, multiplier, offset)
+        except ValueError as e:
+            await interaction.followup.send(f"❌ Nothing changed: {e}", ephemeral=True)
+            return
+        await interaction.followup.send(f"✅ Applied **×{multiplier} {offset:+,} XP** to **{count:,}** member(s)")
+    
+    @app_commands.command(name="xp-export", description="Export this server's XP data (Admin only)")
+    @app_commands.describe(file_format="File format (default: csv)")
+    @app_commands.rename(file_format="format")
+    @app_commands.choices(file_format=[
+        app_commands.Choice(name="csv", value="csv"),
+        app_commands.Choice(name="json lines", value="ndjson")
+    ])
+    @app_commands.checks.has_permissions(administrator=True)
+    async def xp_export(self, interaction: discord.Interaction, file_format: Optional[app_commands.Choice[str]] = None):
+        await interaction.response.defer(ephemeral=True)
+        
+        fmt = file_format.value if file_format else "csv"
+        spool = await self.export_guild(interaction.guild.id, fmt)
+        extension = "csv" if fmt == "csv" else "jsonl"
+        await interaction.followup.send(file=discord.File(spool, filename=f"xp_export_{interaction.guild.id}.{extension}"), ephemeral=True)
+    
+    @app_commands.command(name="leaderboard-export", description="Export this server's full XP ranking (Admin only)")
+    @app_commands.describe(file_format="File format (default: csv)")
+    @app_commands.rename(file_format="format")
+    @app_commands.choices(file_format=[
+        app_commands.Choice(name="csv", value="csv"),
+        app_commands.Choice(name="json lines", value="ndjson")
+    ])
+    @app_commands.checks.has_permissions(administrator=True)
+    async def leaderboard_export(self, interaction: discord.Interaction, file_format: Optional[app_commands.Choice[str]] = None):
+        await interaction.response.defer(ephemeral=True)
+        
+        fmt = file_format.value if file_format else "csv"
+        spool = await self.export_leaderboard(interaction.guild, fmt)
+        
+        size = spool.seek(0, io.SEEK_END)
+        spool.seek(0)
+        if size > interaction.guild.filesize_limit:
+            spool.close()
+            await interaction.followup.send(
+                f"❌ The export is {size / 1024 / 1024:.1f} MB, over this server's "
+                f"{interaction.guild.filesize_limit / 1024 / 1024:.0f} MB upload limit.",
+                ephemeral=True
+            )
+            return
+        
+        extension = "csv" if fmt == "csv" else "jsonl"
+        await interaction.followup.send(
+            file=discord.File(spool, filename=f"leaderboard_{interaction.guild.id}.{extension}"),
+            ephemeral=True
+        )
+    
+    @app_commands.command(name="leveling-stats", description="Show leveling cache statistics (Admin only)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def leveling_stats(self, interaction: discord.Interaction):
+        embed = discord.Embed(title="📊 Leveling Stats", color=discord.Color.blue())
+        embed.add_field(name="Guild XP Tables", value=self.levels_data.stats(), inline=False)
+        embed.add_field(name="Leaderboard Page Cache", value=self.page_cache.stats(), inline=False)
+        embed.add_field(name="Leaderboard Images", value=self.encoding.stats(), inline=False)
+        # Render processes keep their own row tiles, only the thread pool's are visible here
+        if RENDER_POOL != "process":
+            embed.add_field(name="Leaderboard Row Tiles", value=row_cache.stats(), inline=False)
+        embed.add_field(name="Avatar Cache", value=self.avatars.stats(), inline=False)
+        embed.add_field(name="XP Cooldowns", value=self.cooldowns.stats(), inline=False)
+        embed.add_field(name="XP Ingestion", value=self.ingest.stats(), inline=False)
+        embed.add_field(name="Level-up Announcements", value=self.announcer.stats(), inline=False)
+        embed.add_field(
+            name="Role Rewards",
+            value=f"{self.role_edits.stats()}\n{len(self.reward_syncs)} guild sync(s) running",
+            inline=False
+        )
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="leveling-reload-assets", description="Reload leaderboard fonts and background (Admin only)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def leveling_reload_assets(self, interaction: discord.Interaction):
+        # Render processes pick up changed files on their own through check_for_changes()
+        assets.reload()
+        self.page_cache.clear()
         
-        await interaction.response.send_message(f"✅ Set {role.mention} as reward for reaching Level {level}")
+        await interaction.response.send_message("✅ Reloaded leaderboard assets", ephemeral=True)
     
     @xp_add.error
     @xp_remove.error
@@ -615,6 +1145,14 @@ class Leveling(commands.Cog):
     @xp_toggle.error
     @xp_ignore_channel.error
     @xp_role_reward.error
+    @xp_sync_roles.error
+    @xp_recalculate.error
+    @xp_import.error
+    @xp_bulk.error
+    @xp_export.error
+    @leaderboard_export.error
+    @leveling_stats.error
+    @leveling_reload_assets.error
     async def xp_admin_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
         if isinstance(error, app_commands.MissingPermissions):
             await interaction.response.send_message(
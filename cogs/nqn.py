@@ -2,6 +2,8 @@ import discord
 from discord.ext import commands
 import re
 
+from cogs.dispatcher import message_handler, add_message_handlers, remove_message_handlers
+
 EMOJI_REGEX = re.compile(r":([a-zA-Z0-9_]{2,32}):")
 
 class NQN(commands.Cog):
@@ -9,6 +11,12 @@ class NQN(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
+    async def cog_load(self):
+        add_message_handlers(self.bot, self)
+    
+    async def cog_unload(self):
+        remove_message_handlers(self.bot, self)
+    
     async def get_or_create_webhook(self, channel):
         webhooks = await channel.webhooks()
         for wh in webhooks:
@@ -26,12 +34,9 @@ class NQN(commands.Cog):
             return True
         return False
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot or not message.guild:
-            return
-        
-        # Check if message contains emoji shortcodes
+    @message_handler(pattern=EMOJI_REGEX, priority=10)
+    async def replace_emojis(self, message):
+        # The dispatcher only calls this for messages with emoji shortcodes
         matches = EMOJI_REGEX.findall(message.content)
         if not matches:
             return
@@ -1,4 +1,4 @@
-from flask import Flask
+from flask import Flask, jsonify
 from threading import Thread
 
 app = Flask('')
@@ -7,6 +7,12 @@ app = Flask('')
 def home():
     return "Bot is alive!"
 
+@app.route('/health')
+def health():
+    # Cluster heartbeats, only present when running through cluster.py
+    from cluster import read_heartbeats
+    return jsonify(read_heartbeats())
+
 def run():
     app.run(host='0.0.0.0', port=8080)
 
@@ -0,0 +1,146 @@
+import asyncio
+
+import discord
+
+ANNOUNCE_WINDOW = 2.0          # seconds level-ups collect before a channel's message goes out
+ANNOUNCE_CHUNK_INTERVAL = 1.0  # seconds between the parts of a message split at the length limit
+ANNOUNCE_MAX_PENDING = 200     # queued level-ups per channel, the oldest are dropped past this
+ANNOUNCE_MAX_NAMES = 25        # members named in a combined message before "and N more"
+ANNOUNCE_CLOSE_TIMEOUT = 5
+MESSAGE_LIMIT = 2000
+
+
+def join_names(names):
+    if len(names) == 1:
+        return names[0]
+    return f"{', '.join(names[:-1])} and {names[-1]}"
+
+
+def build_messages(level_ups: dict, rewards: list):
+    """Message bodies for one channel's batch, split to fit Discord's length limit
+    
+    level_ups: {user_id: (text, mention, level)} where text is the guild's own level-up
+    message. A lone level-up keeps that text, several are combined into one line.
+    """
+    lines = []
+    if len(level_ups) == 1:
+        text, _, _ = next(iter(level_ups.values()))
+        lines.append(text)
+    elif level_ups:
+        entries = list(level_ups.values())
+        names = [f"{mention} (level {level})" for _, mention, level in entries[:ANNOUNCE_MAX_NAMES]]
+        if len(entries) > ANNOUNCE_MAX_NAMES:
+            names.append(f"{len(entries) - ANNOUNCE_MAX_NAMES} more")
+        lines.append(f"🎉 {join_names(names)} levelled up!")
+    lines.extend(rewards)
+    
+    messages = []
+    current = ""
+    for line in lines:
+        line = line[:MESSAGE_LIMIT]
+        if current and len(current) + 1 + len(line) > MESSAGE_LIMIT:
+            messages.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        messages.append(current)
+    return messages
+
+
+class LevelUpAnnouncer:
+    """Per-channel queue that coalesces level-up announcements
+    
+    announce() and announce_reward() only queue and return. The first entry for a
+    channel starts a task that waits ANNOUNCE_WINDOW, sends everything queued in that
+    time as one message, and keeps going until the channel's queue stays empty, so
+    each channel gets at most one announcement per window however busy it is.
+    """
+    
+    def __init__(self, window: float = ANNOUNCE_WINDOW, max_pending: int = ANNOUNCE_MAX_PENDING):
+        self.window = window
+        self.max_pending = max_pending
+        self.pending = {}
+        self.tasks = {}
+        self.closing = False
+        self.queued = 0
+        self.messages_sent = 0
+        self.dropped = 0
+        self.failures = 0
+    
+    def announce(self, channel, user_id: int, mention: str, level: int, text: str):
+        """Queue a level-up, replacing an earlier one for the same user in this window"""
+        batch = self.batch_for(channel)
+        level_ups = batch["level_ups"]
+        level_ups.pop(user_id, None)
+        level_ups[user_id] = (text, mention, level)
+        self.queued += 1
+        if len(level_ups) > self.max_pending:
+            del level_ups[next(iter(level_ups))]
+            self.dropped += 1
+    
+    def announce_reward(self, channel, text: str):
+        batch = self.batch_for(channel)
+        batch["rewards"].append(text)
+        self.queued += 1
+        if len(batch["rewards"]) > self.max_pending:
+            del batch["rewards"][0]
+            self.dropped += 1
+    
+    def batch_for(self, channel):
+        batch = self.pending.get(channel.id)
+        if batch is None:
+            batch = self.pending[channel.id] = {"channel": channel, "level_ups": {}, "rewards": []}
+        if channel.id not in self.tasks and not self.closing:
+            self.tasks[channel.id] = asyncio.create_task(self.drain(channel.id))
+        return batch
+    
+    async def drain(self, channel_id: int):
+        try:
+            while True:
+                await asyncio.sleep(self.window)
+                batch = self.pending.pop(channel_id, None)
+                if batch is None:
+                    return
+                await self.send(batch)
+        finally:
+            self.tasks.pop(channel_id, None)
+    
+    async def send(self, batch: dict):
+        messages = build_messages(batch["level_ups"], batch["rewards"])
+        for i, content in enumerate(messages):
+            if i:
+                await asyncio.sleep(ANNOUNCE_CHUNK_INTERVAL)
+            try:
+                # discord.py waits out 429s itself, a failure here means the channel is unusable
+                await batch["channel"].send(content)
+                self.messages_sent += 1
+            except discord.HTTPException as e:
+                self.failures += 1
+                print(f"Level-up announcement failed in channel {batch['channel'].id}: {e}")
+                return
+    
+    async def close(self):
+        """Stop the timers and send whatever is still queued, giving up after a few seconds"""
+        self.closing = True
+        for task in list(self.tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        
+        batches, self.pending = list(self.pending.values()), {}
+        if batches:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(self.send(batch) for batch in batches)),
+                    timeout=ANNOUNCE_CLOSE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                pass
+    
+    def stats(self) -> str:
+        pending = sum(len(batch["level_ups"]) + len(batch["rewards"]) for batch in self.pending.values())
+        return (
+            f"{pending} queued in {len(self.pending)} channels\n"
+            f"{self.queued} announcements queued, {self.messages_sent} messages sent, "
+            f"{self.dropped} dropped, {self.failures} failed sends"
+        )
@@ -0,0 +1,196 @@
+import asyncio
+import io
+import os
+import time
+
+import aiohttp
+from PIL import Image
+
+from leveling.cache import LRUCache
+from leveling.render import assets
+
+AVATAR_CACHE_DIR = "avatar_cache"
+AVATAR_CACHE_ENTRIES = 2048
+AVATAR_CACHE_BYTES = 32 * 1024 * 1024
+AVATAR_FETCH_CONCURRENCY = 8
+AVATAR_FETCH_TIMEOUT = 5
+
+# The disk cache is pruned on start and then every AVATAR_PRUNE_INTERVAL seconds: files unused
+# for AVATAR_DISK_MAX_DAYS go, then the least recently used until it fits in AVATAR_DISK_MAX_MB
+AVATAR_DISK_MAX_DAYS = float(os.getenv("LEVELING_AVATAR_CACHE_DAYS", "30"))
+AVATAR_DISK_MAX_BYTES = int(os.getenv("LEVELING_AVATAR_CACHE_MB", "512")) * 1024 * 1024
+AVATAR_PRUNE_INTERVAL = 6 * 60 * 60
+
+# Sizes the Discord CDN serves
+CDN_SIZES = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+def cdn_size_for(size: int) -> int:
+    """Smallest CDN size that is at least the target size, so we never upscale"""
+    return next((cdn_size for cdn_size in CDN_SIZES if cdn_size >= size), CDN_SIZES[-1])
+
+
+def placeholder_avatar(size: int):
+    img = Image.new('RGBA', (size, size), (128, 128, 128, 255))
+    img.putalpha(assets.circle_mask(size))
+    return img
+
+
+def mask_avatar(data: bytes, size: int):
+    """Decode, resize and circle-crop a downloaded avatar"""
+    avatar = Image.open(io.BytesIO(data)).convert('RGBA')
+    avatar = avatar.resize((size, size), Image.Resampling.LANCZOS)
+    
+    output = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    output.paste(avatar, (0, 0))
+    output.putalpha(assets.circle_mask(size))
+    return output
+
+
+class AvatarFetcher:
+    """Downloads avatars over one pooled HTTP session and caches the masked result
+    
+    Avatars are cached by avatar hash and size in memory and in AVATAR_CACHE_DIR,
+    so an unchanged avatar is only downloaded again once it has been pruned from disk.
+    """
+    
+    def __init__(self, cache_dir: str = AVATAR_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.session = None
+        self.semaphore = asyncio.Semaphore(AVATAR_FETCH_CONCURRENCY)
+        self.pending = {}
+        self.memory = LRUCache(AVATAR_CACHE_ENTRIES, AVATAR_CACHE_BYTES, sizeof=lambda img: img.width * img.height * 4)
+        self.downloads = 0
+        self.disk_hits = 0
+        self.failures = 0
+        self.pruned = 0
+        self.prune_task = None
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    async def start(self):
+        self.session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=AVATAR_FETCH_TIMEOUT),
+            connector=aiohttp.TCPConnector(limit=AVATAR_FETCH_CONCURRENCY)
+        )
+        self.prune_task = asyncio.create_task(self.prune_loop())
+    
+    async def close(self):
+        if self.prune_task:
+            self.prune_task.cancel()
+            await asyncio.gather(self.prune_task, return_exceptions=True)
+        if self.session:
+            await self.session.close()
+    
+    async def prune_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.prune_disk)
+            except Exception as e:
+                print(f"Avatar cache pruning failed: {e}")
+            await asyncio.sleep(AVATAR_PRUNE_INTERVAL)
+    
+    def prune_disk(self, max_age: float = AVATAR_DISK_MAX_DAYS * 86400, max_bytes: int = AVATAR_DISK_MAX_BYTES) -> int:
+        """Delete cached avatars unused for max_age seconds, then the oldest until max_bytes is met
+        
+        Disk hits refresh a file's mtime, so mtime order is least recently used first.
+        Returns how many files were deleted.
+        """
+        cutoff = time.time() - max_age
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                # A fresh .tmp is an avatar being saved right now
+                if entry.name.endswith(".tmp") and stat.st_mtime >= cutoff:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        
+        total = sum(size for _, size, _ in files)
+        deleted = 0
+        for mtime, size, path in files:
+            if mtime >= cutoff and total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            deleted += 1
+        self.pruned += deleted
+        return deleted
+    
+    async def fetch_many(self, members, size: int):
+        """Fetch several avatars concurrently, in the same order as members"""
+        return await asyncio.gather(*(self.fetch(member, size) for member in members))
+    
+    async def fetch(self, member, size: int):
+        """Get a member's avatar as a circular PIL image of the given size"""
+        asset = member.display_avatar
+        cache_key = (asset.key, size)
+        
+        avatar = self.memory.get(cache_key)
+        if avatar is not None:
+            return avatar
+        
+        # Members sharing an avatar (e.g. default avatars) share one download
+        if cache_key not in self.pending:
+            self.pending[cache_key] = asyncio.create_task(self.load(asset, size))
+        try:
+            avatar = await asyncio.shield(self.pending[cache_key])
+        except Exception as e:
+            print(f"Avatar fetch error for {member.id}: {e}")
+            return placeholder_avatar(size)
+        finally:
+            self.pending.pop(cache_key, None)
+        
+        self.memory.put(cache_key, avatar)
+        return avatar
+    
+    async def load(self, asset, size: int):
+        """Load an avatar from the disk cache, downloading it on a miss"""
+        path = os.path.join(self.cache_dir, f"{asset.key}_{size}.png")
+        try:
+            avatar = await asyncio.to_thread(self.load_cached, path)
+            if avatar is not None:
+                self.disk_hits += 1
+                return avatar
+            
+            async with self.semaphore:
+                url = asset.with_size(cdn_size_for(size)).with_static_format('png').url
+                async with self.session.get(url) as response:
+                    response.raise_for_status()
+                    data = await response.read()
+            self.downloads += 1
+            return await asyncio.to_thread(self.decode_and_store, data, size, path)
+        except Exception:
+            self.failures += 1
+            raise
+    
+    def load_cached(self, path: str):
+        if not os.path.exists(path):
+            return None
+        with Image.open(path) as img:
+            avatar = img.convert('RGBA')
+        # Marks it as recently used for prune_disk
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return avatar
+    
+    def decode_and_store(self, data: bytes, size: int, path: str):
+        avatar = mask_avatar(data, size)
+        tmp_path = f"{path}.tmp"
+        avatar.save(tmp_path, format='PNG')
+        os.replace(tmp_path, path)
+        return avatar
+    
+    def stats(self) -> str:
+        return (
+            f"{self.memory.stats()}\n"
+            f"{self.downloads} downloads, {self.disk_hits} disk hits, {self.failures} failures, "
+            f"{self.pruned} pruned from disk"
+        )
@@ -0,0 +1,165 @@
+import csv
+import io
+import itertools
+import json
+import tempfile
+
+import aiohttp
+
+from leveling.table import MAX_XP
+
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024  # bigger imports/exports spill to a temp file
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+IMPORT_CHUNK_ROWS = 10_000  # rows parsed per worker thread hop while applying an import
+EXPORT_FIELDS = ["user_id", "level", "xp", "total_xp", "messages"]
+LEADERBOARD_FIELDS = ["rank", "user_id", "display_name", "level", "total_xp", "messages"]
+
+
+class BulkFormatError(ValueError):
+    """Raised when an import file can't be parsed"""
+
+
+def format_for_filename(filename: str) -> str:
+    """"csv" or "ndjson" from a file name"""
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".json", ".jsonl", ".ndjson")):
+        return "ndjson"
+    raise BulkFormatError("Unsupported file type, use .csv or .json/.jsonl (one object per line)")
+
+
+async def download_to_spool(url: str):
+    """Stream a file into a spooled temporary file without holding it all in memory"""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, mode='w+b')
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def parse_id(value, line: int) -> int:
+    """A user ID, parsed exactly: snowflakes don't survive a round trip through float"""
+    text = str(value).strip()
+    if not (text.isascii() and text.isdigit()):
+        raise BulkFormatError(f"Line {line}: invalid user_id {value!r}")
+    user_id = int(text)
+    if user_id >= 2 ** 63:
+        raise BulkFormatError(f"Line {line}: invalid user_id {value!r}")
+    return user_id
+
+
+def parse_int(value, field: str, line: int):
+    """An XP or message count; "1200.0" is accepted since spreadsheets like to write those"""
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        raise BulkFormatError(f"Line {line}: invalid {field} {value!r}")
+    if abs(number) > MAX_XP:
+        raise BulkFormatError(f"Line {line}: {field} {value!r} is out of range")
+    return number
+
+
+def iter_import_rows(spool, fmt: str):
+    """Yield (user_id, total_xp, messages or None) from a CSV or NDJSON file, one line at a time
+    
+    CSV needs a header with user_id and total_xp (or xp); messages is optional.
+    NDJSON needs one object per line with the same keys.
+    """
+    text = io.TextIOWrapper(spool, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == "csv":
+            records = csv.DictReader(text)
+            if not records.fieldnames or "user_id" not in records.fieldnames:
+                raise BulkFormatError("CSV header must include user_id and total_xp (or xp)")
+            start_line = 2
+        else:
+            records = (json.loads(line) for line in text if line.strip())
+            start_line = 1
+        
+        for line, record in enumerate(records, start=start_line):
+            if not isinstance(record, dict):
+                raise BulkFormatError(f"Line {line}: expected an object")
+            xp = record.get("total_xp", record.get("xp"))
+            messages = record.get("messages")
+            yield (
+                parse_id(record.get("user_id"), line),
+                parse_int(xp, "total_xp", line),
+                None if messages in (None, "") else parse_int(messages, "messages", line)
+            )
+    except json.JSONDecodeError as e:
+        raise BulkFormatError(f"Invalid JSON: {e}")
+    except csv.Error as e:
+        raise BulkFormatError(f"Invalid CSV: {e}")
+    finally:
+        text.detach()
+
+
+def count_import_rows(spool, fmt: str) -> int:
+    """Parse a whole import file without keeping the rows, raises BulkFormatError on the first bad line"""
+    count = sum(1 for _ in iter_import_rows(spool, fmt))
+    spool.seek(0)
+    return count
+
+
+def read_chunk(rows, size: int = IMPORT_CHUNK_ROWS) -> list:
+    """The next size rows of an iterator, [] once it's exhausted"""
+    return list(itertools.islice(rows, size))
+
+
+def write_rows(rows, fields, fmt: str):
+    """Write an iterable of row dicts into a spooled temporary file as CSV or NDJSON"""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, mode='w+b')
+    text = io.TextIOWrapper(spool, encoding='utf-8', newline='')
+    if fmt == "csv":
+        writer = csv.DictWriter(text, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+    else:
+        for row in rows:
+            text.write(json.dumps(row) + "\n")
+    text.flush()
+    text.detach()
+    spool.seek(0)
+    return spool
+
+
+def iter_export_rows(records):
+    """Rows for a guild export from (user_id, record) pairs"""
+    for user_id, data in records:
+        yield {
+            # A string in both formats, JSON numbers can't hold every snowflake exactly
+            "user_id": str(user_id),
+            "level": data["level"],
+            "xp": data["xp"],
+            "total_xp": data["total_xp"],
+            "messages": data["messages"]
+        }
+
+
+def iter_leaderboard_rows(records, display_name, present=None):
+    """Rows for a ranking export from (user_id, record) pairs already in rank order
+    
+    display_name(user_id) gives the cached name, or "" for members that aren't cached.
+    With present, users not in that set of member IDs are left out and don't use up a rank.
+    """
+    if present is not None:
+        records = ((user_id, data) for user_id, data in records if int(user_id) in present)
+    for rank, (user_id, data) in enumerate(records, start=1):
+        yield {
+            "rank": rank,
+            # A string in both formats, JSON numbers can't hold every snowflake exactly
+            "user_id": str(user_id),
+            "display_name": display_name(int(user_id)),
+            "level": data["level"],
+            "total_xp": data["total_xp"],
+            "messages": data["messages"]
+        }
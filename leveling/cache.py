@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by entry count and total size in bytes"""
+    
+    def __init__(self, max_entries: int, max_bytes: int, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __contains__(self, key):
+        return key in self.entries
+    
+    def get(self, key, default=None):
+        if key not in self.entries:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return self.entries[key][0]
+    
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+    
+    def pop(self, key):
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[1]
+    
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+    
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    def stats(self) -> str:
+        return (
+            f"{len(self.entries)}/{self.max_entries} entries, "
+            f"{self.bytes / 1024 / 1024:.1f}/{self.max_bytes / 1024 / 1024:.0f} MB\n"
+            f"{self.hit_rate():.0%} hit rate ({self.hits} hits, {self.misses} misses), "
+            f"{self.evictions} evictions"
+        )
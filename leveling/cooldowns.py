@@ -0,0 +1,81 @@
+import heapq
+import time
+
+COOLDOWN_MAX_ENTRIES = 500_000
+COOLDOWN_BUCKET_SECONDS = 5
+
+
+class CooldownTracker:
+    """XP cooldowns keyed by (guild_id, user_id) on the monotonic clock
+    
+    Entries are filed into time buckets by expiry and swept as their bucket passes,
+    so the tracker only holds users still on cooldown. Past max_entries the entries
+    closest to expiring are evicted first.
+    """
+    
+    def __init__(self, max_entries: int = COOLDOWN_MAX_ENTRIES, bucket_seconds: float = COOLDOWN_BUCKET_SECONDS):
+        self.max_entries = max_entries
+        self.bucket_seconds = bucket_seconds
+        self.expiries = {}
+        self.buckets = {}
+        self.bucket_heap = []
+        self.expired = 0
+        self.evictions = 0
+    
+    def __len__(self):
+        return len(self.expiries)
+    
+    def try_acquire(self, guild_id: int, user_id: int, cooldown: float, now: float = None) -> bool:
+        """Start a cooldown and return True, or return False if one is still running
+        
+        now defaults to the current monotonic time; queued messages pass their arrival time.
+        """
+        if now is None:
+            now = time.monotonic()
+        self.sweep(now)
+        
+        key = (guild_id, user_id)
+        expiry = self.expiries.get(key)
+        if expiry is not None and expiry > now:
+            return False
+        if cooldown <= 0:
+            return True
+        
+        if expiry is None and len(self.expiries) >= self.max_entries:
+            self.evict()
+        
+        expiry = now + cooldown
+        self.expiries[key] = expiry
+        bucket = int(expiry // self.bucket_seconds)
+        if bucket not in self.buckets:
+            self.buckets[bucket] = []
+            heapq.heappush(self.bucket_heap, bucket)
+        self.buckets[bucket].append(key)
+        return True
+    
+    def sweep(self, now: float):
+        """Drop entries from every bucket that has fully expired"""
+        current = int(now // self.bucket_seconds)
+        while self.bucket_heap and self.bucket_heap[0] < current:
+            for key in self.buckets.pop(heapq.heappop(self.bucket_heap)):
+                # A key re-acquired since it was filed lives on in a later bucket
+                expiry = self.expiries.get(key)
+                if expiry is not None and expiry <= now:
+                    del self.expiries[key]
+                    self.expired += 1
+    
+    def evict(self):
+        """Make room by dropping the bucket closest to expiring"""
+        while self.bucket_heap and len(self.expiries) >= self.max_entries:
+            bucket = heapq.heappop(self.bucket_heap)
+            for key in self.buckets.pop(bucket):
+                expiry = self.expiries.get(key)
+                if expiry is not None and int(expiry // self.bucket_seconds) == bucket:
+                    del self.expiries[key]
+                    self.evictions += 1
+    
+    def stats(self) -> str:
+        return (
+            f"{len(self.expiries)}/{self.max_entries} users on cooldown in {len(self.buckets)} buckets\n"
+            f"{self.expired} expired, {self.evictions} evicted at the cap"
+        )
@@ -0,0 +1,84 @@
+from bisect import bisect_right
+
+import numpy as np
+
+TABLE_LEVELS = 10_000  # levels precomputed up front, lookups past the table bisect level_start directly
+
+
+class LevelCurve:
+    """Cumulative XP thresholds for one levelling curve, with bisect-based lookups
+    
+    thresholds[level] is the total XP at which that level starts. Everyone is at
+    least level 1, matching how levels have always been stored, so levels 0 and 1 both
+    start at 0 XP whatever the curve says; level_for and the progress bars agree from
+    the first message. The table has a fixed size so a huge XP value costs a few dozen
+    level_start calls, not memory.
+    """
+    
+    def __init__(self, name: str, level_start):
+        self.name = name
+        self.level_start = level_start
+        self.thresholds = [0, 0] + [level_start(level) for level in range(2, TABLE_LEVELS + 1)]
+        self.array = np.asarray(self.thresholds, dtype=np.int64)
+    
+    def level_for(self, xp: int) -> int:
+        if xp < self.thresholds[-1]:
+            return max(1, bisect_right(self.thresholds, xp) - 1)
+        
+        # Past the table: double up to a level that starts beyond xp, then bisect between
+        low = len(self.thresholds) - 1
+        high = low * 2
+        while self.level_start(high) <= xp:
+            low, high = high, high * 2
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self.level_start(middle) <= xp:
+                low = middle
+            else:
+                high = middle
+        return low
+    
+    def threshold(self, level: int) -> int:
+        """Total XP at which a level starts"""
+        if level <= 1:
+            return 0
+        if level >= len(self.thresholds):
+            return self.level_start(level)
+        return self.thresholds[level]
+    
+    def levels_for(self, xp):
+        """Vectorized level_for over a NumPy array of total XP"""
+        levels = np.maximum(np.searchsorted(self.array, xp, side='right') - 1, 1)
+        beyond = np.flatnonzero(xp >= self.thresholds[-1])
+        for index in beyond:
+            levels[index] = self.level_for(int(xp[index]))
+        return levels
+
+
+def flowy_level_start(level: int) -> int:
+    # The curve the rank card and leaderboard progress bars have always drawn
+    return 0 if level == 0 else 5 * (level ** 2) + (50 * level) + 100
+
+
+def mee6_level_start(level: int) -> int:
+    # MEE6: each level costs 5n² + 50n + 100 XP on top of the previous ones
+    return 5 * (level - 1) * level * (2 * level - 1) // 6 + 25 * (level - 1) * level + 100 * level
+
+
+CURVES = {
+    "flowy": LevelCurve("flowy", flowy_level_start),
+    "mee6": LevelCurve("mee6", mee6_level_start),
+}
+DEFAULT_CURVE = "flowy"
+
+
+def recalculate_levels(guild_data, curve: LevelCurve):
+    """Recompute every stored level in a GuildTable, returns the user IDs whose level changed"""
+    user_ids = guild_data.column_view("user_id")
+    levels = guild_data.column_view("level")
+    new_levels = curve.levels_for(guild_data.column_view("total_xp"))
+    
+    # Free rows have user ID -1 and are left alone
+    changed = (new_levels != levels) & (user_ids >= 0)
+    levels[changed] = new_levels[changed]
+    return user_ids[changed].tolist()
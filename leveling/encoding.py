@@ -0,0 +1,104 @@
+import io
+import os
+import time
+
+# Output formats tried for each leaderboard page, smallest result wins.
+# "png" and "webp" are lossless; "jpeg" is only used when neither fits IMAGE_BYTE_BUDGET.
+IMAGE_FORMATS = [fmt.strip() for fmt in os.getenv("LEVELING_IMAGE_FORMATS", "png,webp").split(",") if fmt.strip()]
+IMAGE_BYTE_BUDGET = int(os.getenv("LEVELING_IMAGE_BYTE_BUDGET", str(1024 * 1024)))
+
+PNG_COMPRESS_LEVEL = int(os.getenv("LEVELING_PNG_COMPRESS_LEVEL", "6"))   # 0-9, 1 is ~35% faster and ~15% bigger
+WEBP_METHOD = int(os.getenv("LEVELING_WEBP_METHOD", "4"))                 # 0-6, 6 is far slower for ~3% less
+JPEG_QUALITY = int(os.getenv("LEVELING_JPEG_QUALITY", "85"))
+
+LOSSY_FORMATS = {"jpeg"}
+EXTENSIONS = {"png": "png", "webp": "webp", "jpeg": "jpg"}
+
+
+def save_options(fmt: str) -> dict:
+    if fmt == "png":
+        return {"format": "PNG", "compress_level": PNG_COMPRESS_LEVEL}
+    if fmt == "webp":
+        return {"format": "WEBP", "lossless": True, "method": WEBP_METHOD}
+    if fmt == "jpeg":
+        return {"format": "JPEG", "quality": JPEG_QUALITY, "optimize": True}
+    raise ValueError(f"Unknown leaderboard image format: {fmt}")
+
+
+def encode(img, fmt: str) -> bytes:
+    output = io.BytesIO()
+    img.save(output, **save_options(fmt))
+    return output.getvalue()
+
+
+def encode_smallest(img, formats=None, budget: int = None):
+    """Encode an RGB image in every lossless format and keep the smallest
+    
+    Lossy formats are only tried when no lossless encoding fits in budget. Returns
+    (data, fmt, {fmt: seconds spent encoding}).
+    """
+    formats = IMAGE_FORMATS if formats is None else formats
+    budget = IMAGE_BYTE_BUDGET if budget is None else budget
+    
+    encoded = {}
+    timings = {}
+    ordered = [fmt for fmt in formats if fmt not in LOSSY_FORMATS] + [fmt for fmt in formats if fmt in LOSSY_FORMATS]
+    for fmt in ordered:
+        if fmt in LOSSY_FORMATS and any(len(data) <= budget for data in encoded.values()):
+            break
+        started = time.perf_counter()
+        encoded[fmt] = encode(img, fmt)
+        timings[fmt] = time.perf_counter() - started
+    
+    fmt = min(encoded, key=lambda fmt: len(encoded[fmt]))
+    return encoded[fmt], fmt, timings
+
+
+class EncodingMetrics:
+    """Encode time per format and output size of every rendered leaderboard page"""
+    
+    def __init__(self, budget: int = IMAGE_BYTE_BUDGET):
+        self.budget = budget
+        self.chosen = {}
+        self.encodes = {}
+        self.encode_time = {}
+        self.pages = 0
+        self.total_bytes = 0
+        self.max_bytes = 0
+        self.over_budget = 0
+    
+    def record(self, size: int, fmt: str, timings: dict):
+        self.pages += 1
+        self.total_bytes += size
+        self.max_bytes = max(self.max_bytes, size)
+        if size > self.budget:
+            self.over_budget += 1
+        self.chosen[fmt] = self.chosen.get(fmt, 0) + 1
+        for encoded_fmt, seconds in timings.items():
+            self.encodes[encoded_fmt] = self.encodes.get(encoded_fmt, 0) + 1
+            self.encode_time[encoded_fmt] = self.encode_time.get(encoded_fmt, 0.0) + seconds
+    
+    def metrics(self) -> dict:
+        return {
+            "pages": self.pages,
+            "mean_kb": self.total_bytes / self.pages / 1024 if self.pages else 0.0,
+            "max_kb": self.max_bytes / 1024,
+            "budget_kb": self.budget / 1024,
+            "over_budget": self.over_budget,
+            "chosen": dict(self.chosen),
+            "mean_encode_ms": {
+                fmt: self.encode_time[fmt] / count * 1000
+                for fmt, count in self.encodes.items()
+            }
+        }
+    
+    def stats(self) -> str:
+        m = self.metrics()
+        chosen = ", ".join(f"{fmt} {count}" for fmt, count in m["chosen"].items()) or "none yet"
+        timings = ", ".join(f"{fmt} {ms:.1f} ms" for fmt, ms in m["mean_encode_ms"].items()) or "n/a"
+        return (
+            f"{m['pages']} page(s), mean {m['mean_kb']:.0f} KB, max {m['max_kb']:.0f} KB "
+            f"({m['over_budget']} over the {m['budget_kb']:.0f} KB budget)\n"
+            f"Picked: {chosen}\n"
+            f"Mean encode: {timings}"
+        )
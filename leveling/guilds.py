@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+# Resident XP tables, plus whatever the storage backend keeps per guild, are evicted
+# least recently used first once they add up to more than this
+GUILD_CACHE_BYTES = int(os.getenv("LEVELING_GUILD_CACHE_MB", "256")) * 1024 * 1024
+
+
+class GuildCache:
+    """Guild XP tables loaded from storage on first access and evicted when cold
+    
+    Reads like the old {guild_id: GuildTable} dict, except that every lookup loads the
+    guild if it isn't resident and a guild without users counts as missing: get()
+    returns the default and `in` is False, but indexing returns an empty table to fill.
+    
+    Those lookups load on the calling thread, so async code awaits ensure_loaded() first
+    and a big guild is read in a worker thread instead of stalling the event loop.
+    
+    Only evict() drops tables, and it skips guilds with unflushed changes, so call it
+    right after a flush. Code that changes a table must mark it dirty before awaiting.
+    
+    on_load(guild_id, table) is called on every freshly loaded table just before it
+    becomes resident.
+    """
+    
+    def __init__(self, storage, max_bytes: int = GUILD_CACHE_BYTES, on_load=None):
+        self.storage = storage
+        self.max_bytes = max_bytes
+        self.on_load = on_load
+        self.tables = OrderedDict()
+        self.loading = {}
+        self.loads = 0
+        self.load_time = 0.0
+        self.evictions = 0
+    
+    def __len__(self):
+        return len(self.tables)
+    
+    def __getitem__(self, guild_id):
+        guild_id = str(guild_id)
+        table = self.tables.get(guild_id)
+        if table is None:
+            started = time.perf_counter()
+            table = self.storage.load_guild(guild_id)
+            self.load_time += time.perf_counter() - started
+            self.loads += 1
+            self.admit(guild_id, table)
+        else:
+            self.tables.move_to_end(guild_id)
+        return table
+    
+    async def ensure_loaded(self, guild_id):
+        """Make a guild resident, loading it in a worker thread; concurrent calls share one load"""
+        guild_id = str(guild_id)
+        table = self.tables.get(guild_id)
+        if table is not None:
+            self.tables.move_to_end(guild_id)
+            return table
+        
+        task = self.loading.get(guild_id)
+        if task is None:
+            task = self.loading[guild_id] = asyncio.create_task(self.load(guild_id))
+        # A cancelled caller mustn't cancel the load the others are waiting on
+        return await asyncio.shield(task)
+    
+    async def load(self, guild_id: str):
+        try:
+            started = time.perf_counter()
+            table = await asyncio.to_thread(self.storage.load_guild, guild_id)
+            self.load_time += time.perf_counter() - started
+            self.loads += 1
+            # A synchronous lookup may have loaded the guild, and changed it, in the meantime
+            if guild_id in self.tables:
+                return self.tables[guild_id]
+            self.admit(guild_id, table)
+            return table
+        finally:
+            del self.loading[guild_id]
+    
+    def admit(self, guild_id: str, table):
+        if self.on_load is not None:
+            self.on_load(guild_id, table)
+        self.tables[guild_id] = table
+    
+    def __setitem__(self, guild_id, table):
+        guild_id = str(guild_id)
+        self.tables[guild_id] = table
+        self.tables.move_to_end(guild_id)
+    
+    def __contains__(self, guild_id):
+        return len(self[guild_id]) > 0
+    
+    def get(self, guild_id, default=None):
+        table = self[guild_id]
+        return table if table else default
+    
+    def setdefault(self, guild_id, default=None):
+        return self[guild_id]
+    
+    def guild_nbytes(self, guild_id: str) -> int:
+        """A resident guild's table plus the storage backend's own copy of it, if any"""
+        return self.tables[guild_id].nbytes() + self.storage.guild_nbytes(guild_id)
+    
+    def nbytes(self) -> int:
+        return sum(self.guild_nbytes(guild_id) for guild_id in list(self.tables))
+    
+    def evict(self, dirty) -> list:
+        """Drop the coldest guilds not in dirty until the rest fit in max_bytes; returns their IDs"""
+        total = self.nbytes()
+        evicted = []
+        for guild_id in list(self.tables):
+            if total <= self.max_bytes:
+                break
+            if guild_id in dirty:
+                continue
+            total -= self.guild_nbytes(guild_id)
+            del self.tables[guild_id]
+            self.storage.evict_guild(guild_id)
+            evicted.append(guild_id)
+        self.evictions += len(evicted)
+        return evicted
+    
+    def metrics(self) -> dict:
+        return {
+            "resident": len(self.tables),
+            "bytes": self.nbytes(),
+            "max_bytes": self.max_bytes,
+            "loads": self.loads,
+            "mean_load_ms": self.load_time / self.loads * 1000 if self.loads else 0.0,
+            "evictions": self.evictions
+        }
+    
+    def stats(self) -> str:
+        m = self.metrics()
+        return (
+            f"{m['resident']} guild(s) loaded, "
+            f"{m['bytes'] / 1024 / 1024:.1f}/{m['max_bytes'] / 1024 / 1024:.0f} MB\n"
+            f"{m['loads']} loads (mean {m['mean_load_ms']:.1f} ms), {m['evictions']} evictions"
+        )
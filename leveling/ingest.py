@@ -0,0 +1,134 @@
+import asyncio
+import os
+import time
+
+INGEST_QUEUE_SIZE = int(os.getenv("LEVELING_INGEST_QUEUE_SIZE", "10000"))
+INGEST_BATCH_SIZE = 500
+INGEST_CLOSE_TIMEOUT = 10
+
+# What on_message does when the queue is full:
+#   "drop_newest" - discard the new message (default, on_message never waits)
+#   "drop_oldest" - discard the oldest queued message to make room
+#   "wait"        - await a free slot, which slows down the gateway for every cog
+INGEST_POLICY = os.getenv("LEVELING_INGEST_POLICY", "drop_newest")
+INGEST_POLICIES = ("drop_newest", "drop_oldest", "wait")
+
+
+class XPIngestQueue:
+    """Bounded queue between on_message and the XP award logic
+    
+    on_message only offers a small (guild, author, channel, role_ids, timestamp) tuple.
+    One consumer task takes whatever has piled up, up to batch_size at a time, and awaits
+    process_batch with it, so the per-batch costs (journal write, flush accounting)
+    are paid once per batch instead of once per message.
+    """
+    
+    def __init__(self, process_batch, maxsize: int = INGEST_QUEUE_SIZE, batch_size: int = INGEST_BATCH_SIZE,
+                 policy: str = INGEST_POLICY):
+        if policy not in INGEST_POLICIES:
+            raise ValueError(f"Unknown XP ingest policy: {policy}")
+        self.process_batch = process_batch
+        self.batch_size = batch_size
+        self.policy = policy
+        self.queue = asyncio.Queue(maxsize)
+        self.task = None
+        self.closing = False
+        
+        self.enqueued = 0
+        self.dropped = 0
+        self.processed = 0
+        self.batches = 0
+        self.last_batch = 0
+        self.max_batch = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.errors = 0
+    
+    def start(self):
+        self.task = asyncio.create_task(self.consume())
+    
+    async def offer(self, item) -> bool:
+        """Queue one message, applying the backpressure policy when full; False if it was dropped"""
+        if self.closing:
+            return False
+        
+        if self.queue.full():
+            if self.policy == "wait":
+                await self.queue.put(item)
+                self.enqueued += 1
+                return True
+            self.dropped += 1
+            if self.policy == "drop_newest":
+                return False
+            self.queue.get_nowait()
+            self.queue.task_done()
+        
+        self.queue.put_nowait(item)
+        self.enqueued += 1
+        return True
+    
+    async def consume(self):
+        queue = self.queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            # Lag is how long the oldest message in the batch waited
+            lag = time.monotonic() - batch[0][4]
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.last_batch = len(batch)
+            self.max_batch = max(self.max_batch, len(batch))
+            
+            try:
+                await self.process_batch(batch)
+            except Exception as e:
+                self.errors += 1
+                print(f"XP batch of {len(batch)} failed: {e}")
+            finally:
+                self.batches += 1
+                self.processed += len(batch)
+                for _ in batch:
+                    queue.task_done()
+            
+            # Let the gateway and other tasks run between batches
+            await asyncio.sleep(0)
+    
+    async def close(self):
+        """Stop taking messages and process what's already queued"""
+        self.closing = True
+        if self.task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=INGEST_CLOSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Gave up on {self.queue.qsize()} queued XP message(s)")
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+    
+    def metrics(self) -> dict:
+        return {
+            "depth": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "policy": self.policy,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "batches": self.batches,
+            "last_batch": self.last_batch,
+            "max_batch": self.max_batch,
+            "mean_batch": self.processed / self.batches if self.batches else 0.0,
+            "last_lag_ms": self.last_lag * 1000,
+            "max_lag_ms": self.max_lag * 1000,
+            "errors": self.errors
+        }
+    
+    def stats(self) -> str:
+        m = self.metrics()
+        return (
+            f"{m['depth']}/{m['capacity']} queued ({m['policy']}), {m['dropped']} dropped\n"
+            f"{m['processed']} processed in {m['batches']} batches "
+            f"(last {m['last_batch']}, mean {m['mean_batch']:.1f}, max {m['max_batch']})\n"
+            f"Lag {m['last_lag_ms']:.1f} ms, max {m['max_lag_ms']:.1f} ms"
+        )
@@ -0,0 +1,94 @@
+import glob
+import json
+import os
+
+from leveling.table import GuildTable
+
+JOURNAL_FILE = "levels_journal.log"
+JOURNAL_FSYNC = False  # fsync every append (survives power loss, costs a disk sync per event)
+
+
+class XPJournal:
+    """Append-only log of XP mutations between storage snapshots
+    
+    Each line holds the full record after the mutation, so replaying a line twice is harmless.
+    On every flush the current segment is sealed as JOURNAL_FILE.<seq>; once the snapshot that
+    covers it is written, the sealed segments are deleted.
+    """
+    
+    def __init__(self, path: str = JOURNAL_FILE):
+        self.path = path
+        self.seq = max(self.sealed_segments().keys(), default=0)
+        self.file = open(self.path, 'a')
+    
+    def sealed_segments(self):
+        """Map of sequence number -> path for segments waiting on a snapshot"""
+        segments = {}
+        for path in glob.glob(f"{glob.escape(self.path)}.*"):
+            suffix = path.rsplit('.', 1)[1]
+            if suffix.isdigit():
+                segments[int(suffix)] = path
+        return segments
+    
+    def append(self, op: str, guild_id, user_id, record):
+        """Record a mutation; record is the user's data after it, or None if deleted"""
+        self.append_many([(op, guild_id, user_id, record)])
+    
+    def append_many(self, entries):
+        """Record several (op, guild_id, user_id, record) mutations with a single write"""
+        lines = []
+        for op, guild_id, user_id, record in entries:
+            entry = {
+                "op": op,
+                "g": str(guild_id),
+                "u": str(user_id),
+                "r": None if record is None else [record["xp"], record["level"], record["total_xp"], record["messages"]]
+            }
+            lines.append(json.dumps(entry, separators=(',', ':')) + "\n")
+        if not lines:
+            return
+        self.file.write("".join(lines))
+        self.file.flush()
+        if JOURNAL_FSYNC:
+            os.fsync(self.file.fileno())
+    
+    def replay(self, levels_data):
+        """Apply sealed and current segments to freshly loaded data, returns the touched (guild, user) pairs"""
+        segments = [path for _, path in sorted(self.sealed_segments().items())] + [self.path]
+        touched = set()
+        for path in segments:
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash mid-append leaves at most one partial line
+                        continue
+                    guild_data = levels_data.get(entry["g"])
+                    if guild_data is None:
+                        guild_data = levels_data[entry["g"]] = GuildTable()
+                    if entry["r"] is None:
+                        guild_data.pop(entry["u"], None)
+                    else:
+                        guild_data.set(int(entry["u"]), *entry["r"])
+                    touched.add((entry["g"], entry["u"]))
+        return touched
+    
+    def seal(self) -> int:
+        """Close the current segment so a snapshot can be taken, returns its sequence number"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.seq += 1
+        os.replace(self.path, f"{self.path}.{self.seq}")
+        self.file = open(self.path, 'a')
+        return self.seq
+    
+    def truncate(self, seq: int):
+        """Drop sealed segments up to seq once a snapshot containing them is on disk"""
+        for segment_seq, path in self.sealed_segments().items():
+            if segment_seq <= seq:
+                os.remove(path)
+    
+    def close(self):
+        self.file.close()
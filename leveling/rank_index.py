@@ -0,0 +1,51 @@
+from sortedcontainers import SortedList
+
+
+class RankIndex:
+    """Order-statistics index of one guild's users by total XP
+    
+    Entries are (-total_xp, user_id) so the highest XP sorts first and ties break by user ID.
+    Updates and rank lookups are O(log n), slicing a page is O(log n + k).
+    With present, only users in that set are indexed (members who left keep their record
+    but drop out of the ranking).
+    """
+    
+    def __init__(self, guild_data=None, present=None):
+        self.keys = {}
+        if guild_data:
+            self.keys = {
+                user_id: (-total_xp, user_id)
+                for user_id, total_xp in guild_data.iter_column("total_xp")
+                if present is None or user_id in present
+            }
+        self.entries = SortedList(self.keys.values())
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def update(self, user_id: int, total_xp: int):
+        user_id = int(user_id)
+        key = (-total_xp, user_id)
+        old_key = self.keys.get(user_id)
+        if old_key == key:
+            return
+        if old_key is not None:
+            self.entries.remove(old_key)
+        self.entries.add(key)
+        self.keys[user_id] = key
+    
+    def remove(self, user_id: int):
+        key = self.keys.pop(int(user_id), None)
+        if key is not None:
+            self.entries.remove(key)
+    
+    def rank(self, user_id: int) -> int:
+        """1-based rank of a user, 0 if not tracked"""
+        key = self.keys.get(int(user_id))
+        if key is None:
+            return 0
+        return self.entries.index(key) + 1
+    
+    def page(self, start: int, stop: int):
+        """User IDs ranked start..stop-1 (0-based)"""
+        return [user_id for _, user_id in self.entries.islice(start, stop)]
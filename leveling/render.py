@@ -0,0 +1,329 @@
+import os
+import threading
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont, ImageFilter
+
+from leveling.cache import LRUCache
+from leveling.encoding import encode_smallest
+
+BACKGROUND_IMAGE = os.getenv(
+    "LEVELING_BACKGROUND_IMAGE",
+    r"C:\Users\yosoy\OneDrive\Desktop\Kirito crib\Flowy\leaderboard.jpg"
+)
+
+# Tried in order; Arial on Windows, the usual Linux/macOS fonts otherwise.
+# LEVELING_FONT / LEVELING_BOLD_FONT can point at a specific file.
+REGULAR_FONTS = [
+    os.getenv("LEVELING_FONT"), "arial.ttf", "DejaVuSans.ttf", "LiberationSans-Regular.ttf",
+    "NotoSans-Regular.ttf", "FreeSans.ttf", "Arial.ttf", "Helvetica.ttc"
+]
+BOLD_FONTS = [
+    os.getenv("LEVELING_BOLD_FONT"), "arialbd.ttf", "DejaVuSans-Bold.ttf", "LiberationSans-Bold.ttf",
+    "NotoSans-Bold.ttf", "FreeSansBold.ttf", "Arial Bold.ttf", "Helvetica.ttc"
+]
+
+# Finished rows keyed by everything drawn in them, so page flips mostly paste cached tiles.
+# Each tile is about 170 KB; with a process render pool every worker has its own cache.
+ROW_CACHE_ENTRIES = 1024
+ROW_CACHE_BYTES = 48 * 1024 * 1024
+
+ROW_TILE_WIDTH = 777      # row spans x=12..788 inclusive
+ROW_TILE_HEIGHT = 73      # row spans row_y..row_y+72 inclusive
+BAR_OFFSET = (458, 24)    # progress bar position inside the row tile
+BAR_WIDTH = 290
+BAR_HEIGHT = 24
+
+
+def load_font(candidates, size: int):
+    """First font from candidates Pillow can find, or its built-in font"""
+    for name in candidates:
+        if not name:
+            continue
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def file_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except (OSError, TypeError):
+        return None
+
+
+class RenderAssets:
+    """Fonts, blurred backgrounds and masks shared by every render in this process
+    
+    Everything is built on first use. check_for_changes() drops the cache when the
+    background or a font file changes on disk; reload() drops it unconditionally.
+    Building and dropping happen under one lock, since every render pool thread and
+    /leveling-reload-assets share this object.
+    """
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reload()
+    
+    def reload(self):
+        with self.lock:
+            # Row tiles have the fonts baked in
+            if "row_cache" in globals():
+                with row_cache_lock:
+                    row_cache.clear()
+            self.fonts = None
+            self.backgrounds = {}
+            self.masks = {}
+            self.watched = {BACKGROUND_IMAGE: file_mtime(BACKGROUND_IMAGE)}
+    
+    def check_for_changes(self):
+        with self.lock:
+            if any(file_mtime(path) != mtime for path, mtime in self.watched.items()):
+                self.reload()
+    
+    def get_fonts(self):
+        """(title_font, name_font, stats_font)"""
+        with self.lock:
+            if self.fonts is None:
+                fonts = (
+                    load_font(REGULAR_FONTS, 38),
+                    load_font(BOLD_FONTS, 24),
+                    load_font(REGULAR_FONTS, 17)
+                )
+                for font in fonts:
+                    path = getattr(font, "path", None)
+                    if isinstance(path, str):
+                        self.watched[path] = file_mtime(path)
+                self.fonts = fonts
+            return self.fonts
+    
+    def background(self, width: int, height: int):
+        """Dark base with the background image blurred in at 15%, built once per size"""
+        key = (width, height)
+        with self.lock:
+            if key not in self.backgrounds:
+                # Create solid dark base
+                img = Image.new('RGB', (width, height), '#0f1014')
+                
+                # Load background VERY subtle (only 15% visible)
+                try:
+                    if os.path.exists(BACKGROUND_IMAGE):
+                        with Image.open(BACKGROUND_IMAGE) as bg:
+                            bg = bg.convert('RGB')
+                        bg = bg.resize((width, height), Image.Resampling.LANCZOS)
+                        # Apply heavy blur for aesthetic
+                        bg = bg.filter(ImageFilter.GaussianBlur(radius=3))
+                        # Only 15% opacity - VERY subtle
+                        img = Image.blend(img, bg, 0.15)
+                except Exception as e:
+                    print(f"Background load error: {e}")
+                
+                self.backgrounds[key] = img
+            return self.backgrounds[key].copy()
+    
+    def circle_mask(self, size: int):
+        with self.lock:
+            if size not in self.masks:
+                mask = Image.new('L', (size, size), 0)
+                draw = ImageDraw.Draw(mask)
+                draw.ellipse((0, 0, size, size), fill=255)
+                self.masks[size] = mask
+            return self.masks[size]
+
+
+row_cache = LRUCache(ROW_CACHE_ENTRIES, ROW_CACHE_BYTES, sizeof=lambda tile: tile.width * tile.height * 3)
+row_cache_lock = threading.Lock()
+assets = RenderAssets()
+
+
+@lru_cache(maxsize=4)
+def row_tile(row_bg: tuple):
+    """Row background with its empty progress bar track, drawn once per colour"""
+    tile = Image.new('RGBA', (ROW_TILE_WIDTH, ROW_TILE_HEIGHT), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(tile)
+    draw.rounded_rectangle([(0, 0), (ROW_TILE_WIDTH - 1, ROW_TILE_HEIGHT - 1)],
+                        radius=8, fill=row_bg, outline='#2f3136', width=2)
+    bar_x, bar_y = BAR_OFFSET
+    draw.rounded_rectangle([(bar_x, bar_y), (bar_x + BAR_WIDTH, bar_y + BAR_HEIGHT)],
+                        radius=12, fill='#0f1014', outline='#2f3136', width=1)
+    return tile
+
+
+@lru_cache(maxsize=None)
+def progress_fill(fill_width: int):
+    """Gradient fill for a progress bar of the given width, with rounded ends as alpha"""
+    # One row of gradient colours, stretched to the bar height
+    strip = Image.new('RGB', (fill_width + 1, 1))
+    colors = []
+    for i in range(fill_width + 1):
+        alpha = 1.0 - (min(i, fill_width - 1) / fill_width) * 0.2
+        colors.append((int(88 * alpha), int(101 * alpha), int(242 * alpha)))
+    strip.putdata(colors)
+    strip = strip.resize((fill_width + 1, BAR_HEIGHT - 1), Image.Resampling.NEAREST)
+    
+    mask = Image.new('L', strip.size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle([(0, 0), (fill_width, BAR_HEIGHT - 2)], radius=11, fill=255)
+    strip.putalpha(mask)
+    return strip
+
+
+def row_background(rank: int):
+    # Much darker rows with better contrast
+    if rank % 2 == 0:
+        return (18, 20, 24)
+    return (22, 24, 28)
+
+
+@lru_cache(maxsize=4)
+def row_mask(row_bg: tuple):
+    """Rounded corners of a row, used to paste opaque row tiles onto the page"""
+    return row_tile(row_bg).getchannel('A')
+
+
+def row_key(row: dict):
+    """Everything drawn in a row, or None when the avatar can't be identified"""
+    if row.get("avatar_key") is None:
+        return None
+    return (row["rank"], row["level"], row["total_xp"], row["name"], row["avatar_key"], row["progress"])
+
+
+def cached_row(row: dict):
+    """A row's tile from the row cache, drawn on a miss"""
+    key = row_key(row)
+    if key is not None:
+        with row_cache_lock:
+            tile = row_cache.get(key)
+        if tile is not None:
+            return tile
+    
+    tile = draw_row(row)
+    if key is not None:
+        with row_cache_lock:
+            row_cache.put(key, tile)
+    return tile
+
+
+def draw_row(row: dict):
+    """One leaderboard row as an opaque RGB tile; paste it with row_mask for the corners"""
+    idx = row["rank"]
+    _, name_font, stats_font = assets.get_fonts()
+    
+    # Prebuilt row with rounded corners and the empty progress bar
+    img = row_tile(row_background(idx)).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    
+    # Rank
+    if idx == 1:
+        rank_text = "🥇"
+        rank_color = '#FFD700'
+    elif idx == 2:
+        rank_text = "🥈"
+        rank_color = '#C0C0C0'
+    elif idx == 3:
+        rank_text = "🥉"
+        rank_color = '#CD7F32'
+    else:
+        rank_text = f"#{idx}"
+        rank_color = '#72767d'
+    
+    draw.text((16, 24), rank_text, fill=rank_color, font=name_font)
+    
+    # Avatar
+    avatar = Image.frombytes('RGBA', (row["avatar_size"], row["avatar_size"]), row["avatar"])
+    img.paste(avatar, (73, 14), avatar)
+    
+    # Username
+    username = row["name"][:17]
+    draw.text((138, 12), username, fill='#FFFFFF', font=name_font)
+    
+    # Stats
+    level_text = f"Lvl {row['level']}"
+    xp_text = f"{row['total_xp']:,} XP"
+    
+    draw.text((138, 42), level_text, fill='#5865f2', font=stats_font)
+    draw.text((238, 42), xp_text, fill='#3ba55d', font=stats_font)
+    
+    # Progress bar
+    bar_x, bar_y = BAR_OFFSET
+    bar_width = BAR_WIDTH
+    
+    progress = row["progress"]
+    
+    # Progress fill with gradient effect, cut from a cached strip
+    if progress > 0:
+        fill_width = max(int(bar_width * progress), 24)
+        fill = progress_fill(fill_width)
+        img.paste(fill, (bar_x, bar_y + 1), fill)
+    
+    # Progress text
+    progress_text = f"{int(progress * 100)}%"
+    try:
+        progress_bbox = draw.textbbox((0, 0), progress_text, font=stats_font)
+        progress_width = progress_bbox[2] - progress_bbox[0]
+    except:
+        progress_width = len(progress_text) * 8
+    
+    draw.text((bar_x + (bar_width - progress_width) // 2, bar_y + 5),
+            progress_text, fill='#FFFFFF', font=stats_font)
+    
+    return img
+
+
+def render_leaderboard(page: dict):
+    """Render a leaderboard page to (image bytes, format, encode timings), see encode_smallest
+    
+    Takes only plain data so it can run in a thread or process pool, see draw_leaderboard.
+    """
+    return encode_smallest(draw_leaderboard(page))
+
+
+def draw_leaderboard(page: dict):
+    """Draw a leaderboard page to an RGB image without encoding it
+    
+    page: {"page", "max_pages", "row_count", "rows"}
+    row: {"rank", "slot", "name", "level", "total_xp", "progress", "avatar", "avatar_size"}
+    where "slot" is the row's position on the page and "avatar" holds raw RGBA bytes.
+    Rows with an "avatar_key" (the Discord avatar hash) are drawn once and then pasted
+    from row_cache until anything shown in them changes.
+    """
+    width = 800
+    header_height = 80
+    row_height = 80
+    height = header_height + (page["row_count"] * row_height) + 30
+    
+    assets.check_for_changes()
+    img = assets.background(width, height)
+    draw = ImageDraw.Draw(img)
+    title_font, _, stats_font = assets.get_fonts()
+    
+    # Header with slight transparency
+    draw.rectangle([(0, 0), (width, header_height)], fill=(20, 22, 26))
+    
+    title_text = "🏆 Leaderboard"
+    try:
+        title_bbox = draw.textbbox((0, 0), title_text, font=title_font)
+        title_width = title_bbox[2] - title_bbox[0]
+    except:
+        title_width = len(title_text) * 19
+    
+    draw.text(((width - title_width) // 2, 15), title_text, fill='#FFD700', font=title_font)
+    
+    page_text = f"Page {page['page']}/{page['max_pages']}"
+    try:
+        page_bbox = draw.textbbox((0, 0), page_text, font=stats_font)
+        page_width = page_bbox[2] - page_bbox[0]
+    except:
+        page_width = len(page_text) * 9
+    
+    draw.text(((width - page_width) // 2, 56), page_text, fill='#72767d', font=stats_font)
+    
+    y_offset = header_height + 12
+    
+    for row in page["rows"]:
+        row_y = y_offset + (row["slot"] * row_height)
+        row_bg = row_background(row["rank"])
+        img.paste(cached_row(row), (12, row_y), row_mask(row_bg))
+    
+    return img
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import time
+
+import discord
+
+from leveling.storage import atomic_write, load_json_file
+
+REWARD_SYNC_FILE = "reward_sync.json"
+REWARD_WORKERS = 3             # role edits in flight at once, across every guild
+REWARD_MIN_INTERVAL = 0.25     # seconds between the start of two role edits
+REWARD_MAX_RETRIES = 3
+REWARD_CHUNK_SIZE = 100        # members per chunk; the resume cursor is saved after each
+REWARD_REASON = "Level role rewards"
+
+
+def plan_member(guild, member, level: int, settings):
+    """(roles to add, roles to remove) that bring a member in line with their level
+    
+    Only roles the bot can actually assign are touched.
+    """
+    if not settings.reward_roles:
+        return [], []
+    wanted = settings.rewards_for(level)
+    held = settings.reward_roles.intersection(getattr(member, "_roles", ()))
+    add = []
+    remove = []
+    for role_id in wanted - held:
+        role = guild.get_role(role_id)
+        if role is not None and role.is_assignable():
+            add.append(role)
+    for role_id in held - wanted:
+        role = guild.get_role(role_id)
+        if role is not None and role.is_assignable():
+            remove.append(role)
+    return add, remove
+
+
+class RoleEditQueue:
+    """Role edits applied by a few workers, paced so bursts don't run into rate limits
+    
+    submit() returns a future that resolves to True once the edit went through and to
+    False when Discord refused it. discord.py already waits out most 429s itself; the
+    ones it raises are retried here after the advertised delay.
+    """
+    
+    def __init__(self, workers: int = REWARD_WORKERS, min_interval: float = REWARD_MIN_INTERVAL):
+        self.workers = workers
+        self.min_interval = min_interval
+        self.queue = asyncio.Queue()
+        self.tasks = []
+        self.next_slot = 0.0
+        self.applied = 0
+        self.failed = 0
+        self.rate_limited = 0
+    
+    def start(self):
+        self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+    
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        while not self.queue.empty():
+            future = self.queue.get_nowait()[3]
+            if not future.done():
+                future.cancel()
+    
+    def submit(self, member, add, remove):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((member, add, remove, future))
+        return future
+    
+    async def wait_for_slot(self):
+        now = time.monotonic()
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+    
+    async def worker(self):
+        while True:
+            member, add, remove, future = await self.queue.get()
+            try:
+                ok = await self.apply(member, add, remove)
+                if not future.done():
+                    future.set_result(ok)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.queue.task_done()
+    
+    async def apply(self, member, add, remove) -> bool:
+        for attempt in range(REWARD_MAX_RETRIES):
+            try:
+                if add:
+                    await self.wait_for_slot()
+                    await member.add_roles(*add, reason=REWARD_REASON)
+                    add = []
+                if remove:
+                    await self.wait_for_slot()
+                    await member.remove_roles(*remove, reason=REWARD_REASON)
+                self.applied += 1
+                return True
+            except discord.RateLimited as e:
+                self.rate_limited += 1
+                await asyncio.sleep(e.retry_after)
+            except discord.HTTPException as e:
+                if e.status == 429 and attempt + 1 < REWARD_MAX_RETRIES:
+                    self.rate_limited += 1
+                    await asyncio.sleep(self.min_interval * 2 ** (attempt + 2))
+                    continue
+                # Forbidden, or the member left while the edit was queued
+                self.failed += 1
+                return False
+        self.failed += 1
+        return False
+    
+    def stats(self) -> str:
+        return (
+            f"{self.queue.qsize()} role edits queued, {self.applied} applied, "
+            f"{self.failed} failed, {self.rate_limited} rate limited"
+        )
+
+
+class RewardSyncJob:
+    """One pass over a guild's members, adding missing reward roles and removing extra ones
+    
+    Members are walked in ID order, a chunk at a time. After every chunk the ID cursor
+    and counters are saved to REWARD_SYNC_FILE, so a job cut short by a restart picks
+    up where it stopped.
+    """
+    
+    def __init__(self, guild, state: dict = None):
+        self.guild = guild
+        state = state or {}
+        self.cursor = state.get("cursor", 0)
+        self.checked = state.get("checked", 0)
+        self.added = state.get("added", 0)
+        self.removed = state.get("removed", 0)
+        self.failed = state.get("failed", 0)
+        self.total = 0
+        self.done = False
+    
+    def state(self) -> dict:
+        return {
+            "cursor": self.cursor,
+            "checked": self.checked,
+            "added": self.added,
+            "removed": self.removed,
+            "failed": self.failed
+        }
+    
+    async def run(self, queue: RoleEditQueue, level_of, settings_of, save_state):
+        """level_of(member) -> level, settings_of() -> GuildSettings, save_state(job) after each chunk"""
+        members = sorted((m for m in self.guild.members if not m.bot), key=lambda m: m.id)
+        self.total = len(members)
+        remaining = [m for m in members if m.id > self.cursor]
+        self.checked = self.total - len(remaining)
+        # Recorded up front so a restart before the first chunk still resumes the job
+        save_state(self)
+        
+        for start in range(0, len(remaining), REWARD_CHUNK_SIZE):
+            chunk = remaining[start:start + REWARD_CHUNK_SIZE]
+            settings = settings_of()
+            edits = []
+            for member in chunk:
+                add, remove = plan_member(self.guild, member, level_of(member), settings)
+                if add or remove:
+                    edits.append((len(add), len(remove), queue.submit(member, add, remove)))
+            
+            for added, removed, future in edits:
+                if await future:
+                    self.added += added
+                    self.removed += removed
+                else:
+                    self.failed += 1
+            
+            self.checked += len(chunk)
+            self.cursor = chunk[-1].id
+            save_state(self)
+        
+        self.done = True
+        save_state(self)
+    
+    def progress(self) -> str:
+        total = max(self.total, self.checked)
+        return (
+            f"{self.checked:,}/{total:,} members checked, {self.added:,} roles added, "
+            f"{self.removed:,} removed, {self.failed:,} failed"
+        )
+
+
+class RewardSyncState:
+    """Resume cursors of unfinished sync jobs, keyed by guild ID, in REWARD_SYNC_FILE"""
+    
+    def __init__(self, path: str = REWARD_SYNC_FILE):
+        self.path = path
+        self.jobs = load_json_file(path)
+    
+    def save(self, job: RewardSyncJob):
+        if job.done:
+            self.jobs.pop(str(job.guild.id), None)
+        else:
+            self.jobs[str(job.guild.id)] = job.state()
+        atomic_write(self.path, json.dumps(self.jobs, indent=4))
+    
+    def get(self, guild_id):
+        return self.jobs.get(str(guild_id))
@@ -0,0 +1,74 @@
+from bisect import bisect_right
+
+from leveling.curves import DEFAULT_CURVE
+
+DEFAULT_SETTINGS = {
+    "enabled": True,
+    "xp_rate": 1.0,
+    "xp_min": 15,
+    "xp_max": 25,
+    "cooldown": 60,
+    "level_up_channel": None,
+    "level_up_message": "🎉 {user} leveled up to **Level {level}**!",
+    "ignored_channels": [],
+    "ignored_roles": [],
+    "role_rewards": {},
+    "level_curve": DEFAULT_CURVE
+}
+
+
+def default_settings():
+    """A fresh copy of the default settings dict"""
+    return {
+        key: value.copy() if isinstance(value, (list, dict)) else value
+        for key, value in DEFAULT_SETTINGS.items()
+    }
+
+
+class GuildSettings:
+    """Immutable, pre-parsed view of one guild's settings for the on_message hot path
+    
+    Built from the raw settings dict and rebuilt whenever an admin command saves it.
+    """
+    
+    __slots__ = (
+        "enabled", "xp_rate", "xp_min", "xp_max", "cooldown", "level_up_channel",
+        "level_up_message", "ignored_channels", "ignored_roles", "role_rewards", "level_curve",
+        "reward_levels", "reward_sets", "reward_roles"
+    )
+    
+    def __init__(self, raw: dict):
+        raw = {**DEFAULT_SETTINGS, **raw}
+        init = object.__setattr__
+        init(self, "enabled", bool(raw["enabled"]))
+        init(self, "xp_rate", float(raw["xp_rate"]))
+        init(self, "xp_min", int(raw["xp_min"]))
+        # Older configs could end up with xp_min above xp_max, which randint rejects
+        init(self, "xp_max", max(self.xp_min, int(raw["xp_max"])))
+        init(self, "cooldown", raw["cooldown"])
+        init(self, "level_up_channel", raw["level_up_channel"])
+        init(self, "level_up_message", raw["level_up_message"])
+        init(self, "ignored_channels", frozenset(raw["ignored_channels"]))
+        init(self, "ignored_roles", frozenset(raw["ignored_roles"]))
+        # JSON keys are strings; the hot path looks rewards up by int level
+        init(self, "role_rewards", {int(level): role_id for level, role_id in raw["role_rewards"].items()})
+        init(self, "level_curve", raw["level_curve"])
+        
+        # Reward index: reward_sets[i] holds every role earned by reward_levels[i]
+        levels = sorted(self.role_rewards)
+        earned = set()
+        reward_sets = []
+        for level in levels:
+            earned.add(self.role_rewards[level])
+            reward_sets.append(frozenset(earned))
+        init(self, "reward_levels", tuple(levels))
+        init(self, "reward_sets", tuple(reward_sets))
+        init(self, "reward_roles", frozenset(self.role_rewards.values()))
+    
+    def rewards_for(self, level: int) -> frozenset:
+        """Every reward role a member at this level should have"""
+        i = bisect_right(self.reward_levels, level)
+        return self.reward_sets[i - 1] if i else frozenset()
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("GuildSettings is read-only, change the raw settings and recompile")
@@ -0,0 +1,311 @@
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from leveling.table import GuildTable, UserRecord
+
+LEVELS_DATA_DIR = "levels_data"
+# Single file every guild used to share, split into LEVELS_DATA_DIR on first start
+LEVELS_DATA_FILE = "levels_data.json"
+SETTINGS_DATA_FILE = "level_settings.json"
+LEVELS_DB_FILE = "levels.db"
+
+# "json" keeps the original files, "sqlite" stores everything in LEVELS_DB_FILE
+STORAGE_BACKEND = os.getenv("LEVELING_STORAGE", "json")
+
+
+def cluster_path(path: str) -> str:
+    """Per-process variant of a file that only one process may write, e.g. the XP journal"""
+    # Read on every call: cluster.py sets CLUSTER_ID only after a spawned child has
+    # re-imported this module
+    cluster_id = os.getenv("CLUSTER_ID")
+    if cluster_id is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.cluster{cluster_id}{ext}"
+
+
+def shard_filter(shard_ids, shard_count):
+    """SQL condition and parameters matching the guilds of the given shards"""
+    if not shard_count or shard_ids is None:
+        return "1", ()
+    placeholders = ", ".join("?" * len(shard_ids))
+    return f"(guild_id >> 22) % ? IN ({placeholders})", (shard_count, *shard_ids)
+
+
+def atomic_write(path: str, text: str):
+    """Write a file via temp file + rename so readers never see a partial write"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_json_file(path: str):
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            # Keep the damaged file around instead of overwriting it on the next save
+            os.replace(path, f"{path}.corrupt")
+            print(f"⚠️ {path} corrupted, moved to {path}.corrupt and creating new")
+            return {}
+    return {}
+
+
+class JsonStorage:
+    """Leveling data in levels_data/<guild_id>.json and level_settings.json"""
+    
+    def __init__(self, levels_dir: str = LEVELS_DATA_DIR, settings_file: str = SETTINGS_DATA_FILE):
+        self.levels_dir = levels_dir
+        self.settings_file = settings_file
+        # Last flushed copy of each guild written since it was loaded, only touched by
+        # write_levels and evict_guild (both under the cog's flush lock)
+        self.flushed_data = {}
+        os.makedirs(levels_dir, exist_ok=True)
+        if os.path.exists(LEVELS_DATA_FILE):
+            self.split_levels_file(LEVELS_DATA_FILE)
+    
+    def guild_path(self, guild_id: str) -> str:
+        return os.path.join(self.levels_dir, f"{guild_id}.json")
+    
+    def split_levels_file(self, path: str):
+        """One-shot move from the single levels_data.json to one file per guild"""
+        levels_data = load_json_file(path)
+        for guild_id, users in levels_data.items():
+            atomic_write(self.guild_path(guild_id), json.dumps(users))
+        os.replace(path, f"{path}.migrated")
+        print(f"✅ Split {path} into {len(levels_data)} guild file(s) in {self.levels_dir}/")
+    
+    def load_guild(self, guild_id: str) -> GuildTable:
+        """Load one guild's user records, an empty table if it has none"""
+        return GuildTable.from_records(load_json_file(self.guild_path(guild_id)))
+    
+    def evict_guild(self, guild_id: str):
+        """Forget the flushed copy of a guild the cog no longer holds"""
+        self.flushed_data.pop(guild_id, None)
+    
+    def guild_nbytes(self, guild_id: str) -> int:
+        """Memory held by a guild's flushed copy, counted in the cog's guild cache budget"""
+        guild_data = self.flushed_data.get(guild_id)
+        return guild_data.nbytes() if guild_data is not None else 0
+    
+    def write_levels(self, changes):
+        """Persist {guild_id: {user_id: record or None}} changes (called from a worker thread)
+        
+        Only the files of guilds with changes are rewritten.
+        """
+        for guild_id, users in changes.items():
+            guild_data = self.flushed_data.get(guild_id)
+            if guild_data is None:
+                guild_data = self.flushed_data[guild_id] = self.load_guild(guild_id)
+            for user_id, record in users.items():
+                if record is None:
+                    guild_data.pop(user_id, None)
+                else:
+                    guild_data[user_id] = record
+            atomic_write(self.guild_path(guild_id), guild_data.to_json())
+    
+    def iter_guild(self, guild_id: str):
+        """Yield (user_id, record) as of the last write (call while no write is running)"""
+        guild_data = self.flushed_data.get(guild_id)
+        if guild_data is None:
+            guild_data = self.load_guild(guild_id)
+        yield from guild_data.items()
+    
+    def iter_ranked(self, guild_id: str):
+        """iter_guild in rank order: highest total XP first, ties by user ID"""
+        guild_data = self.flushed_data.get(guild_id)
+        if guild_data is None:
+            guild_data = self.load_guild(guild_id)
+        
+        # Only the row order is materialized, records are read from the columns as we go
+        user_ids = guild_data.column_view("user_id")
+        rows = np.flatnonzero(user_ids >= 0)
+        rows = rows[np.lexsort((user_ids[rows], -guild_data.column_view("total_xp")[rows]))]
+        for row in rows:
+            yield int(user_ids[row]), UserRecord(guild_data.columns, int(row))
+    
+    def load_settings(self, shard_ids=None, shard_count=None):
+        """Load every guild's settings"""
+        self.settings = load_json_file(self.settings_file)
+        return self.settings
+    
+    def save_guild_settings(self, guild_id: str, settings: dict):
+        self.settings[guild_id] = settings
+        atomic_write(self.settings_file, json.dumps(self.settings, indent=4))
+    
+    def close(self):
+        pass
+
+
+class SqliteStorage:
+    """Leveling data in an SQLite database in WAL mode, one row per (guild, user)"""
+    
+    def __init__(self, path: str = LEVELS_DB_FILE):
+        self.path = path
+        # Writes come from worker threads as well as the event loop
+        self.lock = threading.Lock()
+        # Cluster processes share the file, so wait out each other's write locks
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS levels (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                xp INTEGER NOT NULL DEFAULT 0,
+                level INTEGER NOT NULL DEFAULT 1,
+                total_xp INTEGER NOT NULL DEFAULT 0,
+                messages INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS levels_guild_total_xp ON levels (guild_id, total_xp);
+            CREATE TABLE IF NOT EXISTS guild_settings (
+                guild_id INTEGER PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+        """)
+    
+    def load_guild(self, guild_id: str) -> GuildTable:
+        """Load one guild's user records, an empty table if it has none
+        
+        Reads from its own connection, so a load never waits for a flush to release the lock.
+        """
+        table = GuildTable()
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            rows = db.execute(
+                "SELECT user_id, xp, level, total_xp, messages FROM levels WHERE guild_id = ?", (int(guild_id),)
+            )
+            for user_id, xp, level, total_xp, messages in rows:
+                table.set(user_id, xp, level, total_xp, messages)
+        finally:
+            db.close()
+        return table
+    
+    def evict_guild(self, guild_id: str):
+        pass
+    
+    def guild_nbytes(self, guild_id: str) -> int:
+        return 0
+    
+    def write_levels(self, changes):
+        """Upsert or delete changed records in a single transaction"""
+        upserts = []
+        deletes = []
+        for guild_id, users in changes.items():
+            for user_id, record in users.items():
+                if record is None:
+                    deletes.append((int(guild_id), int(user_id)))
+                else:
+                    upserts.append((
+                        int(guild_id), int(user_id),
+                        record["xp"], record["level"], record["total_xp"], record["messages"]
+                    ))
+        
+        with self.lock, self.db:
+            self.db.executemany("""
+                INSERT INTO levels (guild_id, user_id, xp, level, total_xp, messages)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (guild_id, user_id) DO UPDATE SET
+                    xp = excluded.xp,
+                    level = excluded.level,
+                    total_xp = excluded.total_xp,
+                    messages = excluded.messages
+            """, upserts)
+            self.db.executemany("DELETE FROM levels WHERE guild_id = ? AND user_id = ?", deletes)
+    
+    def iter_guild(self, guild_id: str):
+        """Yield (user_id, record) from a separate read connection, highest XP first"""
+        yield from self.iter_ranked(guild_id)
+    
+    def iter_ranked(self, guild_id: str):
+        """iter_guild in rank order: highest total XP first, ties by user ID"""
+        db = sqlite3.connect(self.path)
+        try:
+            rows = db.execute(
+                "SELECT user_id, xp, level, total_xp, messages FROM levels WHERE guild_id = ? "
+                "ORDER BY total_xp DESC, user_id",
+                (int(guild_id),)
+            )
+            for user_id, xp, level, total_xp, messages in rows:
+                yield str(user_id), {"xp": xp, "level": level, "total_xp": total_xp, "messages": messages}
+        finally:
+            db.close()
+    
+    def load_settings(self, shard_ids=None, shard_count=None):
+        """Load every guild's settings, or only those of some shards"""
+        condition, params = shard_filter(shard_ids, shard_count)
+        with self.lock:
+            rows = self.db.execute(f"SELECT guild_id, data FROM guild_settings WHERE {condition}", params).fetchall()
+        return {str(guild_id): json.loads(data) for guild_id, data in rows}
+    
+    def save_guild_settings(self, guild_id: str, settings: dict):
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO guild_settings (guild_id, data) VALUES (?, ?)",
+                (int(guild_id), json.dumps(settings))
+            )
+    
+    def is_empty(self):
+        with self.lock:
+            return self.db.execute("SELECT NOT EXISTS (SELECT 1 FROM levels)").fetchone()[0] and \
+                self.db.execute("SELECT NOT EXISTS (SELECT 1 FROM guild_settings)").fetchone()[0]
+    
+    def migrate_from_json(self, levels_file: str = LEVELS_DATA_FILE, settings_file: str = SETTINGS_DATA_FILE,
+                          levels_dir: str = LEVELS_DATA_DIR):
+        """One-shot import of the JSON files; they are renamed to *.migrated afterwards"""
+        levels_data = load_json_file(levels_file)
+        settings = load_json_file(settings_file)
+        
+        # Per-guild files written by JsonStorage
+        if os.path.isdir(levels_dir):
+            for name in os.listdir(levels_dir):
+                guild_id, ext = os.path.splitext(name)
+                if ext == ".json":
+                    levels_data[guild_id] = load_json_file(os.path.join(levels_dir, name))
+        
+        self.write_levels(levels_data)
+        for guild_id, guild_settings in settings.items():
+            self.save_guild_settings(guild_id, guild_settings)
+        
+        for path in (levels_file, levels_dir, settings_file):
+            if os.path.exists(path):
+                os.replace(path, f"{path}.migrated")
+        
+        user_count = sum(len(users) for users in levels_data.values())
+        print(f"✅ Migrated {user_count} user(s) and {len(settings)} guild setting(s) to {self.path}")
+    
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def create_storage(backend: str = STORAGE_BACKEND):
+    """Build the configured storage backend, migrating JSON data into a fresh SQLite database"""
+    if backend == "sqlite":
+        storage = SqliteStorage()
+        json_files = (LEVELS_DATA_FILE, LEVELS_DATA_DIR, SETTINGS_DATA_FILE)
+        if storage.is_empty() and any(os.path.exists(path) for path in json_files):
+            storage.migrate_from_json()
+        return storage
+    if backend == "json":
+        return JsonStorage()
+    raise ValueError(f"Unknown leveling storage backend: {backend}")
+
+
+if __name__ == "__main__":
+    # python -m leveling.storage: migrate the JSON files into LEVELS_DB_FILE
+    storage = SqliteStorage()
+    if not storage.is_empty():
+        print(f"❌ {LEVELS_DB_FILE} already has data, not migrating")
+    else:
+        storage.migrate_from_json()
+    storage.close()
@@ -0,0 +1,152 @@
+import json
+import sys
+from array import array
+
+import numpy as np
+
+FIELDS = ("xp", "level", "total_xp", "messages")
+NEW_USER = {"xp": 0, "level": 1, "total_xp": 0, "messages": 0}
+MAX_XP = 10 ** 12  # largest XP or message count accepted from bulk tools, far inside int64
+
+
+class UserRecord:
+    """Dict-like view of one user's row in a GuildTable
+    
+    Only valid until the user is deleted from the table, so don't hold on to it
+    across awaits.
+    """
+    
+    __slots__ = ("columns", "row")
+    
+    def __init__(self, columns, row: int):
+        self.columns = columns
+        self.row = row
+    
+    def __getitem__(self, field):
+        return self.columns[field][self.row]
+    
+    def __setitem__(self, field, value):
+        self.columns[field][self.row] = value
+    
+    def keys(self):
+        return FIELDS
+    
+    def __iter__(self):
+        return iter(FIELDS)
+    
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class GuildTable:
+    """One guild's user records as parallel int64 columns
+    
+    Behaves like the old {user_id: {"xp", "level", "total_xp", "messages"}} dict:
+    user IDs may be given as int or str, and records read and write like dicts.
+    Deleted rows are reused by the next new user.
+    """
+    
+    __slots__ = ("rows", "user_ids", "columns", "free")
+    
+    def __init__(self):
+        self.rows = {}
+        self.user_ids = array('q')
+        self.columns = {field: array('q') for field in FIELDS}
+        self.free = []
+    
+    @classmethod
+    def from_records(cls, records: dict):
+        table = cls()
+        for user_id, record in records.items():
+            table[user_id] = record
+        return table
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def __contains__(self, user_id):
+        return int(user_id) in self.rows
+    
+    def __iter__(self):
+        return iter(self.rows)
+    
+    def __getitem__(self, user_id):
+        return UserRecord(self.columns, self.rows[int(user_id)])
+    
+    def get(self, user_id, default=None):
+        row = self.rows.get(int(user_id))
+        return default if row is None else UserRecord(self.columns, row)
+    
+    def __setitem__(self, user_id, record):
+        self.set(int(user_id), record["xp"], record["level"], record["total_xp"], record["messages"])
+    
+    def set(self, user_id: int, xp: int, level: int, total_xp: int, messages: int):
+        row = self.rows.get(user_id)
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+                self.user_ids[row] = user_id
+            else:
+                row = len(self.user_ids)
+                self.user_ids.append(user_id)
+                for column in self.columns.values():
+                    column.append(0)
+            self.rows[user_id] = row
+        columns = self.columns
+        columns["xp"][row] = xp
+        columns["level"][row] = level
+        columns["total_xp"][row] = total_xp
+        columns["messages"][row] = messages
+    
+    def __delitem__(self, user_id):
+        row = self.rows.pop(int(user_id))
+        self.user_ids[row] = -1
+        for column in self.columns.values():
+            column[row] = 0
+        self.free.append(row)
+    
+    def pop(self, user_id, default=None):
+        if int(user_id) not in self.rows:
+            return default
+        record = dict(self[user_id])
+        del self[user_id]
+        return record
+    
+    def items(self):
+        columns = self.columns
+        for user_id, row in self.rows.items():
+            yield user_id, UserRecord(columns, row)
+    
+    def values(self):
+        columns = self.columns
+        for row in self.rows.values():
+            yield UserRecord(columns, row)
+    
+    def iter_column(self, field: str):
+        """Yield (user_id, value) for one field without building records"""
+        column = self.columns[field]
+        for user_id, row in self.rows.items():
+            yield user_id, column[row]
+    
+    def column_view(self, field: str):
+        """Writable NumPy view of a column, including free rows (user ID -1)
+        
+        The table can't grow while a view is alive, so drop it before adding users.
+        """
+        column = self.user_ids if field == "user_id" else self.columns[field]
+        if not column:
+            return np.zeros(0, dtype=np.int64)
+        return np.frombuffer(column, dtype=np.int64)
+    
+    def nbytes(self) -> int:
+        """Approximate memory held by the table: the columns plus the user ID -> row dict"""
+        columns = len(self.user_ids) * self.user_ids.itemsize * (len(FIELDS) + 1)
+        return columns + sys.getsizeof(self.rows) + len(self.rows) * 64
+    
+    def to_json(self) -> str:
+        """Serialize as {user_id: record}, the layout of a guild's file in levels_data/"""
+        columns = self.columns
+        return json.dumps({
+            str(user_id): {field: columns[field][row] for field in FIELDS}
+            for user_id, row in self.rows.items()
+        })